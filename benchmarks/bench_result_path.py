@@ -0,0 +1,55 @@
+"""Compare the DataFrame and NumPy result paths used by idc_service.
+
+Run from the repository root::
+
+    PYTHONPATH=. poetry run python benchmarks/bench_result_path.py | tee bench_output.txt
+"""
+
+import gc
+import statistics
+import time
+import tracemalloc
+
+from dicom_data_explorer.services.idc_index_db import INDEX_TABLE
+from dicom_data_explorer.services.idc_service import (
+    SERIES_COLUMNS,
+    fetch_records,
+    get_db_connection,
+)
+
+ROW_COUNTS = [1_000, 10_000, 100_000]
+REPEATS = 5
+
+
+def dataframe_records(result) -> list[dict]:
+    # The previous implementation of fetch_series.
+    return result.fetchdf().fillna("").to_dict(orient="records")
+
+
+def measure(conn, query: str, fn) -> tuple[float, int]:
+    timings = []
+    for _ in range(REPEATS):
+        gc.collect()
+        started = time.perf_counter()
+        fn(conn.execute(query))
+        timings.append(time.perf_counter() - started)
+    gc.collect()
+    tracemalloc.start()
+    fn(conn.execute(query))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak
+
+
+def main() -> None:
+    print(f"{'rows':>8} {'path':<10} {'median ms':>10} {'peak MiB':>9}")
+    with get_db_connection() as conn:
+        for rows in ROW_COUNTS:
+            query = f"SELECT {SERIES_COLUMNS} FROM {INDEX_TABLE} LIMIT {rows}"
+            for name, fn in (("dataframe", dataframe_records), ("numpy", fetch_records)):
+                seconds, peak = measure(conn, query, fn)
+                print(f"{rows:>8} {name:<10} {seconds * 1000:>10.1f} {peak / 2**20:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
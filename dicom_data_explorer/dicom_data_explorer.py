@@ -3,6 +3,9 @@ from dicom_data_explorer.pages.welcome import welcome_page
 from dicom_data_explorer.pages.idc_search import idc_search_page
 from dicom_data_explorer.pages.downloads import downloads_page
 from dicom_data_explorer.states.idc_state import IDCState
+from dicom_data_explorer.states.download_state import DownloadState
+from dicom_data_explorer.services.download_engine import download_lifespan
+from dicom_data_explorer.services.idc_service import db_lifespan
 from dicom_data_explorer.components.layout import layout
 
 
@@ -21,6 +24,12 @@ app = rx.App(
         ),
     ],
 )
-app.add_page(index, route="/")
-app.add_page(idc_search_page, route="/idc-search", on_load=IDCState.load_initial_data)
-app.add_page(downloads_page, route="/downloads")
\ No newline at end of file
+app.register_lifespan_task(db_lifespan)
+app.register_lifespan_task(download_lifespan)
+app.add_page(index, route="/", on_load=DownloadState.refresh_cart)
+app.add_page(
+    idc_search_page,
+    route="/idc-search",
+    on_load=[IDCState.load_initial_data, DownloadState.refresh_cart],
+)
+app.add_page(downloads_page, route="/downloads", on_load=DownloadState.load_downloads)
\ No newline at end of file
@@ -0,0 +1,221 @@
+"""Headless batch downloads with the same engine and catalog as the app.
+
+Jobs go to a queue database of their own unless ``--queue`` says otherwise;
+either way a run only claims and recovers its own job.
+
+    python -m dicom_data_explorer.download_cli series.csv
+    python -m dicom_data_explorer.download_cli search.json --dest /data/DICOM
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+from dicom_data_explorer.services.download_engine import (
+    DOWNLOAD_ROOT,
+    DownloadEngine,
+    running_engine,
+)
+from dicom_data_explorer.services.download_queue import DownloadQueue
+from dicom_data_explorer.services.download_verify import VERIFY_DOWNLOADS
+from dicom_data_explorer.services.idc_index_db import CACHE_DIR
+from dicom_data_explorer.services.idc_query import SeriesFilter
+from dicom_data_explorer.services.idc_service import (
+    close_db_pool,
+    fetch_series,
+    fetch_series_by_uids,
+)
+from dicom_data_explorer.services.s3_downloader import S3Downloader
+
+CLI_QUEUE_PATH = CACHE_DIR / "cli_download_queue.sqlite3"
+SEARCH_LIMIT = 100_000
+REPORT_INTERVAL_S = 5.0
+MB = 1024 * 1024
+# Saved-search fields and their types, as in SeriesFilter.
+SEARCH_FIELDS = {
+    "collection": str,
+    "modality": str,
+    "body_part": str,
+    "text": str,
+    "min_images": int,
+    "max_images": int,
+}
+
+
+def search_filter(fields: dict) -> SeriesFilter:
+    """A SeriesFilter from a saved search, rejecting values of the wrong type.
+
+    Image counts may be given as numbers or numeric strings.
+    """
+    values = {}
+    for name, value in fields.items():
+        kind = SEARCH_FIELDS.get(name)
+        if kind is None or value is None:
+            continue
+        if kind is int:
+            if isinstance(value, bool) or not isinstance(value, (int, str)):
+                raise TypeError(f"search field {name!r} must be an integer")
+            value = int(value)
+        elif not isinstance(value, str):
+            raise TypeError(f"search field {name!r} must be a string")
+        values[name] = value
+    return SeriesFilter(**values)
+
+
+def read_manifest(path: Path) -> tuple[list[str], SeriesFilter | None]:
+    """Series UIDs listed in a manifest, or the filter of a saved search.
+
+    CSV manifests use their ``SeriesInstanceUID`` column (or the first column
+    when there is no such header). JSON manifests hold a list of UIDs or of
+    objects with ``SeriesInstanceUID``, ``{"series": [...]}``, or a saved
+    search ``{"search": {"collection": ..., "modality": ..., ...}}`` using the
+    fields of :class:`SeriesFilter`.
+    """
+    if path.suffix.lower() == ".csv":
+        with open(path, newline="", encoding="utf-8") as handle:
+            rows = [row for row in csv.reader(handle) if row]
+        column = 0
+        if rows and "SeriesInstanceUID" in rows[0]:
+            column = rows[0].index("SeriesInstanceUID")
+            rows = rows[1:]
+        uids = [row[column] for row in rows if len(row) > column]
+    else:
+        with open(path, encoding="utf-8") as handle:
+            data = json.load(handle)
+        if isinstance(data, dict) and "search" in data:
+            return [], search_filter(data["search"])
+        if isinstance(data, dict):
+            data = data.get("series", [])
+        uids = [
+            entry.get("SeriesInstanceUID", "") if isinstance(entry, dict) else entry
+            for entry in data
+        ]
+    return list(dict.fromkeys(str(uid).strip() for uid in uids if uid)), None
+
+
+def resolve_items(
+    series_uids: list[str], search: SeriesFilter | None, limit: int = SEARCH_LIMIT
+) -> list[dict]:
+    """Cart-style items for the manifest, looked up in the local IDC index."""
+    try:
+        if search is not None:
+            rows = fetch_series(search, limit=limit)
+        else:
+            found = {
+                row["SeriesInstanceUID"]: row
+                for row in fetch_series_by_uids(series_uids)
+            }
+            missing = [uid for uid in series_uids if uid not in found]
+            if missing:
+                logging.warning(
+                    "%d series are not in the IDC index, e.g. %s",
+                    len(missing),
+                    ", ".join(missing[:3]),
+                )
+            rows = [found[uid] for uid in series_uids if uid in found]
+    finally:
+        close_db_pool()
+    return [row | {"source": "IDC"} for row in rows]
+
+
+def _report(engine: DownloadEngine, job_id: int) -> None:
+    progress = engine.queue.progress(job_id)
+    rate = engine.downloader.throughput() if engine.downloader else 0.0
+    logging.info(
+        "Job %s: %d/%d series, %d/%d files (%d failed), %.1f/%.1f MB, %.1f MB/s",
+        job_id,
+        progress["finished_series"],
+        progress["total_series"],
+        progress["downloaded_files"],
+        progress["total_files"],
+        progress["failed_files"],
+        progress["downloaded_bytes"] / MB,
+        progress["planned_bytes"] / MB,
+        rate / MB,
+    )
+
+
+async def download(engine: DownloadEngine, items: list[dict], owner: str) -> str:
+    """Queue ``items`` (or pick up ``owner``'s unfinished job) and wait for it.
+
+    Returns the job's final state, ``completed`` or ``failed``.
+    """
+    queue = engine.queue
+    job_id = await asyncio.to_thread(queue.open_job, owner)
+    if job_id is None:
+        job_id = await asyncio.to_thread(queue.enqueue, items, owner)
+    else:
+        logging.info("Resuming download job %s", job_id)
+    async with running_engine(engine):
+        last_report = time.monotonic()
+        while True:
+            await asyncio.sleep(1.0)
+            state = await asyncio.to_thread(queue.job_state, job_id)
+            if state in ("completed", "failed"):
+                break
+            if time.monotonic() - last_report >= REPORT_INTERVAL_S:
+                await asyncio.to_thread(_report, engine, job_id)
+                last_report = time.monotonic()
+        await asyncio.to_thread(_report, engine, job_id)
+    return state
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Download IDC series listed in a manifest or matched by a "
+        "saved search."
+    )
+    parser.add_argument("manifest", type=Path, help="CSV or JSON manifest")
+    parser.add_argument(
+        "--dest", type=Path, default=DOWNLOAD_ROOT, help="download root directory"
+    )
+    parser.add_argument(
+        "--queue", type=Path, default=CLI_QUEUE_PATH, help="download queue database"
+    )
+    parser.add_argument(
+        "--connections", type=int, default=0, help="concurrent transfers"
+    )
+    parser.add_argument(
+        "--verify", action="store_true", help="verify every downloaded object"
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=SEARCH_LIMIT,
+        help="maximum series taken from a saved search",
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    try:
+        series_uids, search = read_manifest(args.manifest)
+    except (OSError, ValueError, TypeError) as e:
+        logging.error("Could not read manifest %s: %s", args.manifest, e)
+        return 2
+    items = resolve_items(series_uids, search, args.limit)
+    if not items:
+        logging.error("No IDC series to download in %s", args.manifest)
+        return 2
+
+    owner = f"cli:{args.manifest.resolve()}"
+    engine = DownloadEngine(
+        DownloadQueue(args.queue, worker=owner),
+        S3Downloader(args.connections) if args.connections else None,
+        verify=args.verify or VERIFY_DOWNLOADS,
+        download_root=args.dest,
+    )
+    try:
+        state = asyncio.run(download(engine, items, owner))
+    except KeyboardInterrupt:
+        logging.info("Interrupted; run the same command again to resume")
+        return 130
+    return 0 if state == "completed" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
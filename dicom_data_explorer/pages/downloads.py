@@ -52,6 +52,10 @@ def history_item(item: dict) -> rx.Component:
                         f"Downloaded on {item['downloaded_at']}",
                         class_name="text-xs text-gray-500",
                     ),
+                    rx.el.p(
+                        f"{item['files']} files • {item['size_mb']} MB • {item['transferred_mb']} MB transferred in {item['duration_s']}s ({item['avg_mb_s']} MB/s)",
+                        class_name="text-xs text-gray-400",
+                    ),
                 ),
                 class_name="flex items-center gap-3",
             ),
@@ -65,6 +69,66 @@ def history_item(item: dict) -> rx.Component:
     )
 
 
+def series_progress_row(row: dict) -> rx.Component:
+    return rx.el.div(
+        rx.el.div(
+            rx.el.span(
+                row["collection"],
+                class_name="text-xs font-medium text-gray-700 truncate",
+            ),
+            rx.el.span(
+                f"{row['status']} • {row['files']} files • {row['done_mb']} / {row['planned_mb']} MB • {row['throughput_mb_s']} MB/s",
+                class_name="text-xs text-gray-500",
+            ),
+            class_name="flex justify-between gap-2",
+        ),
+        rx.el.div(
+            rx.el.div(
+                class_name="h-1 bg-blue-400 rounded-full",
+                style={"width": f"{row['percent']}%"},
+            ),
+            class_name="w-full h-1 bg-gray-200 rounded-full overflow-hidden mt-1",
+        ),
+        class_name="mt-2",
+    )
+
+
+def download_progress() -> rx.Component:
+    return rx.cond(
+        DownloadState.is_downloading,
+        rx.el.div(
+            rx.el.div(
+                rx.el.div(
+                    class_name="h-2 bg-blue-600 rounded-full transition-all duration-300",
+                    style={"width": f"{DownloadState.download_progress}%"},
+                ),
+                class_name="w-full h-2 bg-gray-200 rounded-full overflow-hidden mb-2",
+            ),
+            rx.el.div(
+                rx.el.p(
+                    DownloadState.progress_message,
+                    class_name="text-xs text-gray-500",
+                ),
+                rx.el.p(
+                    f"{DownloadState.downloaded_files} / {DownloadState.total_files} files",
+                    class_name="text-xs text-gray-600 font-medium",
+                ),
+                class_name="mt-2 flex items-center justify-between",
+            ),
+            rx.el.p(
+                f"{DownloadState.transferred_mb} / {DownloadState.planned_mb} MB • {DownloadState.throughput_mb_s} MB/s • ETA {DownloadState.eta_label}",
+                class_name="mt-1 text-xs text-gray-500",
+            ),
+            rx.el.div(
+                rx.foreach(DownloadState.series_progress, series_progress_row),
+                class_name="mt-2 max-h-64 overflow-y-auto",
+            ),
+            class_name="mb-6 p-4 bg-blue-50 rounded-xl border border-blue-100",
+        ),
+        None,
+    )
+
+
 def downloads_content() -> rx.Component:
     return rx.el.div(
         rx.el.div(
@@ -92,6 +156,7 @@ def downloads_content() -> rx.Component:
                     ),
                     class_name="flex justify-between items-center mb-4",
                 ),
+                download_progress(),
                 rx.cond(
                     DownloadState.cart_count > 0,
                     rx.el.div(
@@ -105,6 +170,14 @@ def downloads_content() -> rx.Component:
                                 ),
                                 class_name="flex justify-between mb-2",
                             ),
+                            rx.el.div(
+                                rx.el.span("Total Images:", class_name="text-gray-600"),
+                                rx.el.span(
+                                    DownloadState.cart_images,
+                                    class_name="font-bold text-gray-900",
+                                ),
+                                class_name="flex justify-between mb-2",
+                            ),
                             rx.el.div(
                                 rx.el.span("Est. Size:", class_name="text-gray-600"),
                                 rx.el.span(
@@ -113,37 +186,10 @@ def downloads_content() -> rx.Component:
                                 ),
                                 class_name="flex justify-between mb-6",
                             ),
-                            rx.cond(
-                                DownloadState.is_downloading,
-                                rx.el.div(
-                                    rx.el.div(
-                                        class_name="h-2 bg-blue-600 rounded-full transition-all duration-300",
-                                        style={
-                                            "width": f"{DownloadState.download_progress}%"
-                                        },
-                                    ),
-                                    class_name="w-full h-2 bg-gray-200 rounded-full overflow-hidden mb-2",
-                                ),
-                                rx.el.button(
-                                    "Download All Series",
-                                    on_click=DownloadState.start_download,
-                                    class_name="w-full bg-blue-600 text-white py-3 rounded-xl font-bold hover:bg-blue-700 shadow-lg hover:shadow-xl transition-all",
-                                ),
-                            ),
-                            rx.cond(
-                                DownloadState.is_downloading,
-                                rx.el.div(
-                                    rx.el.p(
-                                        DownloadState.progress_message,
-                                        class_name="text-xs text-gray-500",
-                                    ),
-                                    rx.el.p(
-                                        f"{DownloadState.downloaded_files} / {DownloadState.total_files} files",
-                                        class_name="text-xs text-gray-600 font-medium",
-                                    ),
-                                    class_name="mt-2 flex items-center justify-between",
-                                ),
-                                None,
+                            rx.el.button(
+                                "Download All Series",
+                                on_click=DownloadState.start_download,
+                                class_name="w-full bg-blue-600 text-white py-3 rounded-xl font-bold hover:bg-blue-700 shadow-lg hover:shadow-xl transition-all",
                             ),
                             class_name="mt-6 p-6 bg-gray-50 rounded-xl border border-gray-200",
                         ),
@@ -24,7 +24,10 @@ def filter_sidebar() -> rx.Component:
                 rx.el.option("All Collections", value=""),
                 rx.foreach(
                     IDCState.collections,
-                    lambda c: rx.el.option(c["Collection"], value=c["Collection"]),
+                    lambda c: rx.el.option(
+                        f"{c['Collection']} ({c['series_count']})",
+                        value=c["Collection"],
+                    ),
                 ),
                 value=IDCState.selected_collection,
                 on_change=lambda val: IDCState.update_filters("collection", val),
@@ -42,7 +45,13 @@ def filter_sidebar() -> rx.Component:
             ),
             rx.el.select(
                 rx.el.option("All Modalities", value=""),
-                rx.foreach(IDCState.modalities, lambda m: rx.el.option(m, value=m)),
+                rx.foreach(
+                    IDCState.modalities,
+                    lambda m: rx.el.option(
+                        f"{m['Modality']} ({m['series_count']})",
+                        value=m["Modality"],
+                    ),
+                ),
                 value=IDCState.selected_modality,
                 on_change=lambda val: IDCState.update_filters("modality", val),
                 class_name="w-full rounded-lg border-gray-300 border p-2 text-sm focus:border-blue-500 focus:ring-1 focus:ring-blue-500 bg-white appearance-none",
@@ -59,7 +68,13 @@ def filter_sidebar() -> rx.Component:
             ),
             rx.el.select(
                 rx.el.option("All Body Parts", value=""),
-                rx.foreach(IDCState.body_parts, lambda b: rx.el.option(b, value=b)),
+                rx.foreach(
+                    IDCState.body_parts,
+                    lambda b: rx.el.option(
+                        f"{b['BodyPartExamined']} ({b['series_count']})",
+                        value=b["BodyPartExamined"],
+                    ),
+                ),
                 value=IDCState.selected_body_part,
                 on_change=lambda val: IDCState.update_filters("body_part", val),
                 class_name="w-full rounded-lg border-gray-300 border p-2 text-sm focus:border-blue-500 focus:ring-1 focus:ring-blue-500 bg-white appearance-none",
@@ -102,6 +117,15 @@ def results_table_row(series: dict, index: int) -> rx.Component:
         ),
         rx.el.td(
             rx.el.div(
+                rx.cond(
+                    series["is_local"],
+                    rx.el.span(
+                        rx.icon("hard-drive", size=12),
+                        "Local",
+                        class_name="inline-flex items-center gap-1 px-2 py-0.5 mr-3 rounded-full text-xs font-medium bg-emerald-100 text-emerald-800",
+                        title="Already downloaded",
+                    ),
+                ),
                 rx.el.button(
                     "Details",
                     on_click=IDCState.select_series(series["SeriesInstanceUID"]),
@@ -175,9 +199,27 @@ def results_view() -> rx.Component:
             ),
             rx.el.div(
                 rx.el.span(
-                    f"Page {IDCState.page} of {IDCState.total_pages}",
+                    f"{IDCState.total_count} series • Page {IDCState.page} of {IDCState.total_pages}",
                     class_name="text-sm text-gray-500",
                 ),
+                rx.cond(
+                    IDCState.bulk_add_message != "",
+                    rx.el.span(
+                        IDCState.bulk_add_message,
+                        class_name="text-sm text-green-700",
+                    ),
+                ),
+                rx.el.button(
+                    rx.icon("shopping-cart", size=16),
+                    rx.cond(
+                        IDCState.is_adding_all,
+                        "Adding...",
+                        f"Add all {IDCState.total_count} to Cart",
+                    ),
+                    on_click=IDCState.add_all_to_cart,
+                    disabled=IDCState.is_adding_all | (IDCState.total_count == 0),
+                    class_name="flex items-center gap-2 px-3 py-1.5 bg-green-600 text-white text-sm font-medium rounded-lg hover:bg-green-700 disabled:opacity-50 transition-colors",
+                ),
                 class_name="flex items-center gap-4",
             ),
             class_name="flex justify-between items-end mb-6",
@@ -230,6 +272,7 @@ def results_view() -> rx.Component:
                     class_name="block text-xs font-medium text-gray-600 mb-1",
                 ),
                 rx.el.select(
+                    rx.el.option("Relevance", value="Relevance"),
                     rx.el.option("Date", value="SeriesDate"),
                     rx.el.option("Images", value="ImageCount"),
                     rx.el.option("Modality", value="Modality"),
@@ -253,6 +296,14 @@ def results_view() -> rx.Component:
             ),
             class_name="flex flex-wrap items-end gap-4 mb-6",
         ),
+        rx.cond(
+            IDCState.error_message != "",
+            rx.el.p(
+                IDCState.error_message,
+                class_name="mb-4 text-sm text-red-600",
+            ),
+            None,
+        ),
         rx.cond(
             IDCState.is_loading,
             rx.el.div(
@@ -301,13 +352,13 @@ def results_view() -> rx.Component:
                     rx.el.div(
                         rx.el.button(
                             "Previous",
-                            on_click=IDCState.set_page(IDCState.page - 1),
+                            on_click=IDCState.prev_page,
                             disabled=IDCState.page <= 1,
                             class_name="px-4 py-2 border border-gray-300 rounded-md text-sm font-medium text-gray-700 bg-white hover:bg-gray-50 disabled:opacity-50 disabled:cursor-not-allowed",
                         ),
                         rx.el.button(
                             "Next",
-                            on_click=IDCState.set_page(IDCState.page + 1),
+                            on_click=IDCState.next_page,
                             disabled=IDCState.page >= IDCState.total_pages,
                             class_name="px-4 py-2 border border-gray-300 rounded-md text-sm font-medium text-gray-700 bg-white hover:bg-gray-50 disabled:opacity-50 disabled:cursor-not-allowed",
                         ),
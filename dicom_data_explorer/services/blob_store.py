@@ -0,0 +1,125 @@
+import contextlib
+import hashlib
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+from urllib.parse import urlparse
+
+from dicom_data_explorer.services.s3_downloader import is_complete, part_path_for
+
+UUID_PATTERN = re.compile(
+    r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$"
+)
+
+
+def blob_id(url: str) -> str:
+    """Content identity of the object behind ``url``.
+
+    IDC names every instance file after its ``crdc_instance_uuid``, which is
+    reissued whenever the file content changes, so one instance has one id
+    across buckets, series and carts. Other names fall back to a hash of the
+    URL.
+    """
+    stem = Path(urlparse(url).path).stem.lower()
+    if UUID_PATTERN.match(stem):
+        return stem
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+
+class BlobStore:
+    """Content-addressed store that backs the per-series download folders.
+
+    Each object is fetched once into ``root/<id[:2]>/<id>``; the usual
+    ``Collection/SeriesInstanceUID`` folders are views made of hard links
+    into the store, or symlinks where a hard link is not possible (e.g. the
+    store lives on another filesystem).
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self._lock = threading.Lock()
+        self._stats = {
+            "linked": 0,
+            "symlinked": 0,
+            "reused": 0,
+            "reused_bytes": 0,
+            "adopted": 0,
+        }
+
+    def path_for(self, blob: str) -> Path:
+        return self.root / blob[:2] / blob
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._stats[name] += amount
+
+    def link(self, blob_path: Path, dest_path: Path) -> None:
+        """Point ``dest_path`` at ``blob_path``, replacing whatever is there."""
+        with contextlib.suppress(OSError):
+            if dest_path.samefile(blob_path):
+                return
+        dest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = dest_path.with_name(
+            f"{dest_path.name}.{os.getpid()}.{threading.get_ident()}.link"
+        )
+        with contextlib.suppress(FileNotFoundError):
+            tmp_path.unlink()
+        try:
+            os.link(blob_path, tmp_path)
+            self._count("linked")
+        except OSError:
+            os.symlink(blob_path.resolve(), tmp_path)
+            self._count("symlinked")
+        os.replace(tmp_path, dest_path)
+
+    def materialize(self, blob: str, dest_path: Path, size: int = 0) -> bool:
+        """Make ``dest_path`` available without a download, if possible.
+
+        A complete blob is linked into place; a complete plain file already at
+        ``dest_path`` (downloaded before the store existed) is adopted into
+        the store. Returns False when the object still has to be fetched into
+        :meth:`path_for`, after moving any partial download there so it can
+        be resumed.
+        """
+        blob_path = self.path_for(blob)
+        if is_complete(blob_path, size):
+            self.link(blob_path, dest_path)
+            self._count("reused")
+            self._count("reused_bytes", size)
+            return True
+        blob_path.parent.mkdir(parents=True, exist_ok=True)
+        if is_complete(dest_path, size) and not dest_path.is_symlink():
+            try:
+                os.replace(self._hardlink_tmp(dest_path, blob_path), blob_path)
+                self._count("adopted")
+            except OSError as e:
+                logging.warning("Could not add %s to blob store: %s", dest_path, e)
+            return True
+        old_part, blob_part = part_path_for(dest_path), part_path_for(blob_path)
+        if old_part.is_file() and not blob_part.exists():
+            with contextlib.suppress(OSError):
+                os.replace(old_part, blob_part)
+        return False
+
+    def discard(self, blob: str, dest_path: Path) -> None:
+        """Drop a bad copy so the next attempt downloads it from scratch."""
+        blob_path = self.path_for(blob)
+        for path in (dest_path, blob_path, part_path_for(blob_path)):
+            with contextlib.suppress(FileNotFoundError):
+                path.unlink()
+
+    @staticmethod
+    def _hardlink_tmp(source: Path, blob_path: Path) -> Path:
+        tmp_path = blob_path.with_name(
+            f"{blob_path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        )
+        with contextlib.suppress(FileNotFoundError):
+            tmp_path.unlink()
+        os.link(source, tmp_path)
+        return tmp_path
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
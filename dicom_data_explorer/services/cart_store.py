@@ -0,0 +1,160 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from dicom_data_explorer.services.idc_index_db import CACHE_DIR
+
+CART_PATH = CACHE_DIR / "carts.sqlite3"
+# Carts belong to browser tabs, which never say goodbye; a cart nobody has
+# added to for this long is dropped (0 keeps carts forever).
+CART_TTL_DAYS = float(os.getenv("IDC_CART_TTL_DAYS", "30"))
+PRUNE_INTERVAL_S = 3600.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cart_items (
+    owner TEXT NOT NULL,
+    series_uid TEXT NOT NULL,
+    source TEXT NOT NULL DEFAULT '',
+    added_at TEXT NOT NULL,
+    PRIMARY KEY (owner, series_uid)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cart_items_added ON cart_items (owner, added_at);
+"""
+
+
+def _now() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+class CartStore:
+    """Server-side carts: one set of series UIDs per browser (owner id).
+
+    Only UIDs are kept; series metadata stays in the IDC index and is looked
+    up for the rows a page actually shows, so a cart can hold a whole search
+    without growing the per-session state sent to the browser.
+    """
+
+    def __init__(self, path: Path = CART_PATH, ttl_days: float = CART_TTL_DAYS):
+        self.path = path
+        self.ttl_days = ttl_days
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self._next_prune = 0.0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _prune(self, conn: sqlite3.Connection) -> None:
+        """Drop carts that have not been added to within the TTL."""
+        if self.ttl_days <= 0 or time.monotonic() < self._next_prune:
+            return
+        self._next_prune = time.monotonic() + PRUNE_INTERVAL_S
+        cutoff = (datetime.now() - timedelta(days=self.ttl_days)).strftime(
+            "%Y-%m-%d %H:%M:%S"
+        )
+        with conn:
+            pruned = conn.execute(
+                """
+                DELETE FROM cart_items WHERE owner IN (
+                    SELECT owner FROM cart_items
+                    GROUP BY owner
+                    HAVING max(added_at) < ?
+                )
+                """,
+                [cutoff],
+            ).rowcount
+        if pruned:
+            logging.info("Dropped %d expired cart entries", pruned)
+
+    def add(self, owner: str, series_uids: list[str], source: str) -> list[str]:
+        """Add UIDs not already in the cart; returns the ones that were new."""
+        now = _now()
+        with self._lock:
+            conn = self._connection()
+            self._prune(conn)
+            with conn:
+                rows = conn.execute(
+                    """
+                    INSERT OR IGNORE INTO cart_items (owner, series_uid, source, added_at)
+                    SELECT ?, value, ?, ? FROM json_each(?)
+                    RETURNING series_uid
+                    """,
+                    [owner, source, now, json.dumps(series_uids)],
+                ).fetchall()
+        return [row["series_uid"] for row in rows]
+
+    def remove(self, owner: str, series_uid: str) -> bool:
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                return (
+                    conn.execute(
+                        "DELETE FROM cart_items WHERE owner = ? AND series_uid = ?",
+                        [owner, series_uid],
+                    ).rowcount
+                    > 0
+                )
+
+    def clear(self, owner: str) -> None:
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM cart_items WHERE owner = ?", [owner])
+
+    def series_uids(self, owner: str, source: str = "") -> list[str]:
+        """Every UID in the cart (optionally of one source), oldest first."""
+        with self._lock:
+            rows = self._connection().execute(
+                """
+                SELECT series_uid FROM cart_items
+                WHERE owner = ? AND (? = '' OR source = ?)
+                ORDER BY added_at, series_uid
+                """,
+                [owner, source, source],
+            ).fetchall()
+        return [row["series_uid"] for row in rows]
+
+    def page(self, owner: str, limit: int, offset: int = 0) -> list[dict]:
+        """Newest cart entries first, for display."""
+        with self._lock:
+            rows = self._connection().execute(
+                """
+                SELECT series_uid, source, added_at FROM cart_items
+                WHERE owner = ?
+                ORDER BY added_at DESC, series_uid
+                LIMIT ? OFFSET ?
+                """,
+                [owner, limit, offset],
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+
+_store: CartStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_cart_store() -> CartStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = CartStore()
+        return _store
@@ -0,0 +1,459 @@
+import asyncio
+import contextlib
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from dicom_data_explorer.services.blob_store import BlobStore, blob_id
+from dicom_data_explorer.services.download_queue import DownloadQueue
+from dicom_data_explorer.services.download_verify import (
+    VERIFY_ATTEMPTS,
+    VERIFY_DOWNLOADS,
+    VERIFY_WORKERS,
+    verify_object,
+)
+from dicom_data_explorer.services.idc_manifest import (
+    list_manifest,
+    parse_s3_url,
+    resolve_manifests,
+)
+from dicom_data_explorer.services.local_catalog import (
+    LocalCatalog,
+    get_local_catalog,
+)
+from dicom_data_explorer.services.s3_downloader import (
+    S3Downloader,
+    ThroughputMeter,
+    get_downloader,
+)
+
+DOWNLOAD_ROOT = Path(os.getenv("PUBLIC_DICOM_DIR", "/Users/Shared/DICOM"))
+# Content-addressed instance store behind the series folders (defaults to
+# <download root>/.blobs); keep it on the same filesystem as the download
+# root so series views can be hard links.
+BLOB_DIR = os.getenv("IDC_BLOB_DIR", "")
+LIST_CONCURRENCY = int(os.getenv("IDC_LIST_CONCURRENCY", "8"))
+POLL_INTERVAL_S = 2.0
+
+
+def sanitize_segment(value: str) -> str:
+    if not value:
+        return "unknown"
+    safe = str(value).strip().replace("/", "_").replace("\\", "_")
+    return safe or "unknown"
+
+
+def series_dir_for(item: dict, root: Path = DOWNLOAD_ROOT) -> Path:
+    collection = sanitize_segment(item.get("Collection", ""))
+    return root / collection / sanitize_segment(
+        item.get("SeriesInstanceUID", "")
+    )
+
+
+def relative_key_path(key: str, prefix: str) -> Path:
+    key_path = Path(key)
+    if prefix and key.startswith(prefix):
+        return key_path.relative_to(Path(prefix))
+    return Path(key_path.name)
+
+
+def plan_objects(
+    item: dict, manifest: dict, store: BlobStore, root: Path = DOWNLOAD_ROOT
+) -> list[dict]:
+    """Turn a manifest into object tasks.
+
+    Objects already in the blob store (or on disk) are linked into the
+    series folder right away and start done.
+    """
+    series_dir = series_dir_for(item, root)
+    series_dir.mkdir(parents=True, exist_ok=True)
+    objects = []
+    for obj in manifest["objects"]:
+        url = f"https://{manifest['bucket']}.s3.amazonaws.com/{obj['key']}"
+        dest_path = series_dir / relative_key_path(obj["key"], manifest["prefix"])
+        present = store.materialize(blob_id(url), dest_path, obj["size"])
+        objects.append(
+            {
+                "key": obj["key"],
+                "url": url,
+                "dest_path": str(dest_path),
+                "size": obj["size"],
+                "etag": obj.get("etag", ""),
+                "state": "done" if present else "pending",
+            }
+        )
+    return objects
+
+
+class DownloadEngine:
+    """Background worker that drains the durable download queue.
+
+    It runs on the app's event loop, independent of any browser session:
+    pending series are planned (manifest, then object tasks) a few at a
+    time, and pending objects are handed to the shared :class:`S3Downloader`
+    while keeping only a couple of batches in flight.
+    """
+
+    def __init__(
+        self,
+        queue: DownloadQueue,
+        downloader: S3Downloader | None = None,
+        list_concurrency: int = LIST_CONCURRENCY,
+        store: BlobStore | None = None,
+        catalog: LocalCatalog | None = None,
+        verify: bool = VERIFY_DOWNLOADS,
+        download_root: Path = DOWNLOAD_ROOT,
+    ):
+        self.queue = queue
+        self.downloader = downloader
+        self.download_root = download_root
+        self.store = store or BlobStore(
+            Path(BLOB_DIR) if BLOB_DIR else download_root / ".blobs"
+        )
+        self.catalog = catalog or get_local_catalog()
+        self.list_concurrency = list_concurrency
+        self.verify = verify
+        self._verify_pool: ProcessPoolExecutor | None = None
+        self._verifying: set[asyncio.Task] = set()
+        self._wake: asyncio.Event | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._planning: set[asyncio.Task] = set()
+        self._inflight: set[asyncio.Task] = set()
+        self._series_limits: dict[int, asyncio.Semaphore] = {}
+        # One fetch per blob at a time; other series needing the same
+        # instance wait for it and then link.
+        self._blob_fetches: dict[str, asyncio.Future] = {}
+        # Bytes received so far by running objects, and per-series rates; fed
+        # from download threads, read by progress pollers.
+        self._live_lock = threading.Lock()
+        self._partial: dict[int, list[int]] = {}
+        self._series_meters: dict[int, ThroughputMeter] = {}
+
+    def notify(self) -> None:
+        """Wake the worker after new work was queued; safe from any thread."""
+        if self._loop is not None and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def run(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        if self.downloader is None:
+            self.downloader = get_downloader()
+        await asyncio.to_thread(self.queue.recover)
+        if self.verify:
+            self._verify_pool = ProcessPoolExecutor(max_workers=VERIFY_WORKERS)
+        try:
+            while True:
+                self._wake.clear()
+                try:
+                    await self._plan()
+                    await self._dispatch()
+                except Exception as e:
+                    logging.exception(f"Error running download queue: {e}")
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._wake.wait(), POLL_INTERVAL_S)
+        finally:
+            for task in self._planning | self._inflight | self._verifying:
+                task.cancel()
+            if self._verify_pool is not None:
+                self._verify_pool.shutdown(wait=False, cancel_futures=True)
+                self._verify_pool = None
+
+    async def _plan(self) -> None:
+        free = self.list_concurrency - len(self._planning)
+        series = await asyncio.to_thread(self.queue.claim_series, free)
+        if not series:
+            return
+        series = await asyncio.to_thread(self._plan_local, series)
+        if not series:
+            self.notify()
+            return
+        urls = {
+            task["series_uid"]: task["item"].get("series_aws_url", "") for task in series
+        }
+        try:
+            resolved, _ = await asyncio.to_thread(resolve_manifests, urls)
+        except Exception as e:
+            logging.exception(f"Error resolving IDC manifests: {e}")
+            resolved = {}
+        for task in series:
+            self._spawn(
+                self._planning,
+                self._plan_series(
+                    task, urls[task["series_uid"]], resolved.get(task["series_uid"])
+                ),
+            )
+
+    def _plan_local(self, series: list[dict]) -> list[dict]:
+        """Complete series the local catalog already has; return the rest."""
+        remaining = []
+        for task in series:
+            try:
+                objects = self.catalog.local_objects(task["series_uid"])
+                if objects is not None:
+                    objects = self._link_local(task["item"], objects)
+            except Exception as e:
+                logging.exception(f"Error reading local catalog: {e}")
+                objects = None
+            if objects is None:
+                remaining.append(task)
+                continue
+            logging.info("Series %s is already local", task["series_uid"])
+            self.queue.add_objects(task["id"], objects)
+        return remaining
+
+    def _link_local(self, item: dict, objects: list[dict]) -> list[dict]:
+        """Link catalogued files into this engine's series folder.
+
+        The catalog is shared by every download root, so a series fetched
+        into another root is linked (like a blob) rather than downloaded.
+        """
+        series_dir = series_dir_for(item, self.download_root)
+        _, prefix = parse_s3_url(item.get("series_aws_url", ""))
+        for obj in objects:
+            dest_path = series_dir / relative_key_path(obj["key"], prefix)
+            self.store.link(Path(obj["dest_path"]), dest_path)
+            obj["dest_path"] = str(dest_path)
+        return objects
+
+    def _complete_series(self, series_task_id: int) -> None:
+        """Catalog a completed series, after checking its instance count."""
+        try:
+            item, objects = self.queue.completed_series(series_task_id)
+            try:
+                expected = int(item.get("ImageCount") or 0)
+            except (TypeError, ValueError):
+                expected = 0
+            if self.verify and expected and expected != len(objects):
+                logging.warning(
+                    "Series %s has %d instances, the index lists %d",
+                    item.get("SeriesInstanceUID", ""),
+                    len(objects),
+                    expected,
+                )
+                self.queue.fail_series(
+                    series_task_id,
+                    f"Expected {expected} instances, found {len(objects)}",
+                )
+                return
+            self.catalog.record_series(item, objects)
+        except Exception as e:
+            logging.exception(f"Error updating local catalog: {e}")
+
+    async def _plan_series(
+        self, task: dict, series_aws_url: str, manifest: dict | None
+    ) -> None:
+        try:
+            if manifest is None:
+                manifest = await asyncio.to_thread(
+                    list_manifest, task["series_uid"], series_aws_url
+                )
+            objects = await asyncio.to_thread(
+                plan_objects, task["item"], manifest, self.store, self.download_root
+            )
+            state = await asyncio.to_thread(
+                self.queue.add_objects, task["id"], objects
+            )
+            if state == "completed":
+                await asyncio.to_thread(self._complete_series, task["id"])
+        except Exception as e:
+            logging.exception("IDC planning failed for %s: %s", task["series_uid"], e)
+            await asyncio.to_thread(self.queue.fail_series, task["id"], str(e))
+        self.notify()
+
+    async def _dispatch(self) -> None:
+        free = 2 * self.downloader.max_connections - len(self._inflight)
+        objects = await asyncio.to_thread(self.queue.claim_objects, free)
+        for obj in objects:
+            self._spawn(self._inflight, self._transfer(obj))
+
+    async def _transfer(self, obj: dict) -> None:
+        series_task_id = obj["series_task_id"]
+        limit = self._series_limits.get(series_task_id)
+        if limit is None:
+            limit = self.downloader.series_limit()
+            self._series_limits[series_task_id] = limit
+        with self._live_lock:
+            partial = self._partial[obj["id"]] = [series_task_id, 0]
+            meter = self._series_meters.setdefault(series_task_id, ThroughputMeter())
+
+        def on_chunk(nbytes: int) -> None:
+            with self._live_lock:
+                partial[1] += nbytes
+            meter.add(nbytes)
+
+        error = None
+        transferred = 0
+        try:
+            transferred = await self._fetch_blob(obj, limit, on_chunk)
+        except Exception as e:
+            logging.error("Download failed for %s: %s", obj["key"], e)
+            error = str(e) or type(e).__name__
+        finally:
+            with self._live_lock:
+                self._partial.pop(obj["id"], None)
+        if error is None and self._verify_pool is not None:
+            # Checked in the background so the connection slot is free again.
+            self._spawn(self._verifying, self._verify(obj, transferred))
+            return
+        await self._finish(obj, error, transferred)
+
+    async def _verify(self, obj: dict, transferred: int) -> None:
+        pool = self._verify_pool
+        try:
+            problem = await asyncio.get_running_loop().run_in_executor(
+                pool,
+                verify_object,
+                obj["dest_path"],
+                obj["size"],
+                obj["etag"],
+                obj["series_uid"],
+            )
+        except Exception as e:
+            # The object was not checked, so it must not count as done; its
+            # file is kept and checked again on the next attempt.
+            logging.exception(f"Error verifying {obj['key']}: {e}")
+            if isinstance(e, BrokenProcessPool) and pool is self._verify_pool:
+                self._verify_pool = ProcessPoolExecutor(max_workers=VERIFY_WORKERS)
+                pool.shutdown(wait=False, cancel_futures=True)
+            await self._retry(obj, f"Could not verify: {e}", transferred)
+            return
+        if problem is None:
+            await self._finish(obj, None, transferred)
+            return
+        logging.warning("Verification failed for %s: %s", obj["key"], problem)
+        await asyncio.to_thread(
+            self.store.discard, blob_id(obj["url"]), Path(obj["dest_path"])
+        )
+        await self._retry(obj, problem, transferred)
+
+    async def _retry(self, obj: dict, problem: str, transferred: int) -> None:
+        requeued = await asyncio.to_thread(
+            self.queue.requeue_object, obj["id"], problem, VERIFY_ATTEMPTS, transferred
+        )
+        if requeued:
+            self.notify()
+        else:
+            await self._finish(obj, f"Verification failed: {problem}", transferred)
+
+    async def _finish(self, obj: dict, error: str | None, transferred: int) -> None:
+        series_task_id = obj["series_task_id"]
+        series_state = await asyncio.to_thread(
+            self.queue.finish_object, obj["id"], error, transferred
+        )
+        if series_state == "completed":
+            await asyncio.to_thread(self._complete_series, series_task_id)
+        if series_state is not None:
+            self._series_limits.pop(series_task_id, None)
+            with self._live_lock:
+                self._series_meters.pop(series_task_id, None)
+        self.notify()
+
+    async def _fetch_blob(self, obj: dict, limit, on_chunk) -> int:
+        """Fetch ``obj`` into the blob store and link it into its series folder."""
+        blob = blob_id(obj["url"])
+        blob_path = self.store.path_for(blob)
+        dest_path = Path(obj["dest_path"])
+        pending = self._blob_fetches.get(blob)
+        if pending is not None:
+            await asyncio.shield(pending)
+            transferred = 0
+        else:
+            # Registered before the first await so a concurrent transfer of
+            # the same instance waits instead of writing the same .part file.
+            pending = self._blob_fetches[blob] = asyncio.ensure_future(
+                self._fill_blob(obj, blob, dest_path, limit, on_chunk)
+            )
+            try:
+                transferred = await pending
+            finally:
+                self._blob_fetches.pop(blob, None)
+        await asyncio.to_thread(self.store.link, blob_path, dest_path)
+        return transferred
+
+    async def _fill_blob(
+        self, obj: dict, blob: str, dest_path: Path, limit, on_chunk
+    ) -> int:
+        if await asyncio.to_thread(
+            self.store.materialize, blob, dest_path, obj["size"]
+        ):
+            return 0
+        return await self.downloader.download(
+            obj["url"],
+            self.store.path_for(blob),
+            limit,
+            obj["size"],
+            obj["etag"],
+            on_chunk,
+        )
+
+    def live_progress(self) -> dict[int, dict]:
+        """In-flight bytes and current rate per series task, for progress views."""
+        with self._live_lock:
+            live = {
+                series_task_id: {"partial_bytes": 0, "throughput": meter.rate()}
+                for series_task_id, meter in self._series_meters.items()
+            }
+            for series_task_id, nbytes in self._partial.values():
+                live.setdefault(series_task_id, {"partial_bytes": 0, "throughput": 0.0})
+                live[series_task_id]["partial_bytes"] += nbytes
+        return live
+
+    def _spawn(self, tasks: set[asyncio.Task], coro) -> None:
+        task = asyncio.create_task(coro)
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+
+_queue: DownloadQueue | None = None
+_engine: DownloadEngine | None = None
+_engine_lock = threading.Lock()
+
+
+def get_download_queue() -> DownloadQueue:
+    global _queue
+    with _engine_lock:
+        if _queue is None:
+            _queue = DownloadQueue()
+        return _queue
+
+
+def get_download_engine() -> DownloadEngine:
+    global _engine
+    queue = get_download_queue()
+    with _engine_lock:
+        if _engine is None:
+            _engine = DownloadEngine(queue)
+        return _engine
+
+
+@contextlib.asynccontextmanager
+async def running_engine(engine: DownloadEngine):
+    """Run ``engine`` in the background, then shut it and its resources down."""
+    worker = asyncio.create_task(engine.run())
+    try:
+        yield engine
+    finally:
+        worker.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await worker
+        logging.info("Download queue stats at shutdown: %s", engine.queue.stats())
+        logging.info("Blob store stats at shutdown: %s", engine.store.stats())
+        logging.info("Local catalog at shutdown: %s", engine.catalog.stats())
+        if engine.downloader is not None:
+            logging.info(
+                "S3 downloader stats at shutdown: %s", engine.downloader.stats()
+            )
+            engine.downloader.shutdown()
+        engine.queue.close()
+        engine.catalog.close()
+
+
+@contextlib.asynccontextmanager
+async def download_lifespan():
+    """Run the download worker for as long as the app is up."""
+    async with running_engine(get_download_engine()):
+        yield
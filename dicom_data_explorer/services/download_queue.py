@@ -0,0 +1,663 @@
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from dicom_data_explorer.services.idc_index_db import CACHE_DIR
+
+QUEUE_PATH = CACHE_DIR / "download_queue.sqlite3"
+HISTORY_LIMIT = 100
+SERIES_PROGRESS_LIMIT = 50
+MB = 1024 * 1024
+
+# Series: pending -> planning -> downloading -> completed | failed
+# Objects: pending -> running -> done | failed
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    owner TEXT NOT NULL DEFAULT '',
+    state TEXT NOT NULL DEFAULT 'queued',
+    created_at TEXT NOT NULL,
+    finished_at TEXT,
+    worker TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS series_tasks (
+    id INTEGER PRIMARY KEY,
+    job_id INTEGER NOT NULL REFERENCES jobs (id),
+    series_uid TEXT NOT NULL,
+    item TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    total_files INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    finished_at TEXT,
+    estimated_bytes INTEGER NOT NULL DEFAULT 0,
+    planned_bytes INTEGER NOT NULL DEFAULT 0,
+    transferred_bytes INTEGER NOT NULL DEFAULT 0,
+    started_at TEXT
+);
+CREATE TABLE IF NOT EXISTS object_tasks (
+    id INTEGER PRIMARY KEY,
+    series_task_id INTEGER NOT NULL REFERENCES series_tasks (id),
+    key TEXT NOT NULL,
+    url TEXT NOT NULL,
+    dest_path TEXT NOT NULL,
+    size INTEGER NOT NULL DEFAULT 0,
+    etag TEXT NOT NULL DEFAULT '',
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    UNIQUE (series_task_id, key)
+);
+CREATE INDEX IF NOT EXISTS series_tasks_state ON series_tasks (state);
+CREATE INDEX IF NOT EXISTS object_tasks_state ON object_tasks (state);
+CREATE INDEX IF NOT EXISTS object_tasks_series ON object_tasks (series_task_id, state);
+CREATE INDEX IF NOT EXISTS series_tasks_job ON series_tasks (job_id, state);
+CREATE INDEX IF NOT EXISTS jobs_owner ON jobs (owner, state);
+"""
+SCHEMA_VERSION = 3
+# Until a series is planned only the index's size estimate is known.
+PLANNED_BYTES = (
+    "CASE WHEN s.state IN ('pending', 'planning') "
+    "THEN s.estimated_bytes ELSE s.planned_bytes END"
+)
+# Columns added after the first release of the queue.
+_ADDED_COLUMNS = {
+    "series_tasks": {
+        "estimated_bytes": "INTEGER NOT NULL DEFAULT 0",
+        "planned_bytes": "INTEGER NOT NULL DEFAULT 0",
+        "transferred_bytes": "INTEGER NOT NULL DEFAULT 0",
+        "started_at": "TEXT",
+    },
+    "jobs": {"worker": "TEXT NOT NULL DEFAULT ''"},
+}
+
+# Jobs and series tasks belonging to one worker (bound to a single parameter).
+_WORKER_JOBS = "SELECT id FROM jobs WHERE worker = ?"
+_WORKER_SERIES = (
+    "SELECT s.id FROM series_tasks s JOIN jobs j ON j.id = s.job_id "
+    "WHERE j.worker = ?"
+)
+
+
+def _now() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _estimated_bytes(item: dict) -> int:
+    """Size from the index, used until the series' manifest is known."""
+    try:
+        return int(float(item.get("series_size_MB") or 0) * MB)
+    except (TypeError, ValueError):
+        return 0
+
+
+class DownloadQueue:
+    """SQLite-backed queue of download jobs, series tasks and object tasks.
+
+    Every state change is committed immediately, so work survives a server
+    restart: :meth:`recover` puts anything that was in flight back to
+    pending, and partially written objects resume from their ``.part`` file.
+
+    Jobs are tagged with the ``worker`` of the queue that enqueued them, and
+    a queue only claims and recovers its own worker's jobs, so several
+    processes (the app and batch downloads) can share one database.
+    """
+
+    def __init__(self, path: Path = QUEUE_PATH, worker: str = ""):
+        self.path = path
+        self.worker = worker
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.executescript(SCHEMA)
+            self._migrate(conn)
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection) -> None:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+        with conn:
+            for table, columns in _ADDED_COLUMNS.items():
+                existing = {
+                    row["name"] for row in conn.execute(f"PRAGMA table_info({table})")
+                }
+                for column, definition in columns.items():
+                    if column not in existing:
+                        conn.execute(
+                            f"ALTER TABLE {table} ADD COLUMN {column} {definition}"
+                        )
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def enqueue(self, items: list[dict], owner: str = "") -> int:
+        """Queue one job with a series task per cart item; returns the job id."""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                job_id = conn.execute(
+                    "INSERT INTO jobs (owner, worker, created_at) VALUES (?, ?, ?)",
+                    [owner, self.worker, _now()],
+                ).lastrowid
+                conn.executemany(
+                    """
+                    INSERT INTO series_tasks (job_id, series_uid, item, estimated_bytes)
+                    VALUES (?, ?, ?, ?)
+                    """,
+                    [
+                        (
+                            job_id,
+                            item.get("SeriesInstanceUID", ""),
+                            json.dumps(item),
+                            _estimated_bytes(item),
+                        )
+                        for item in items
+                    ],
+                )
+        logging.info("Queued download job %s with %d series", job_id, len(items))
+        return job_id
+
+    def recover(self) -> None:
+        """Return this worker's work interrupted by a shutdown to pending."""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                objects = conn.execute(
+                    f"""
+                    UPDATE object_tasks SET state = 'pending'
+                    WHERE state = 'running' AND series_task_id IN ({_WORKER_SERIES})
+                    """,
+                    [self.worker],
+                ).rowcount
+                series = conn.execute(
+                    f"""
+                    UPDATE series_tasks SET state = 'pending'
+                    WHERE state = 'planning' AND job_id IN ({_WORKER_JOBS})
+                    """,
+                    [self.worker],
+                ).rowcount
+        if objects or series:
+            logging.info(
+                "Recovered %d series and %d objects from the download queue",
+                series,
+                objects,
+            )
+
+    def claim_series(self, limit: int) -> list[dict]:
+        if limit <= 0:
+            return []
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                rows = conn.execute(
+                    f"""
+                    UPDATE series_tasks SET state = 'planning'
+                    WHERE id IN (
+                        SELECT id FROM series_tasks
+                        WHERE state = 'pending' AND job_id IN ({_WORKER_JOBS})
+                        ORDER BY id LIMIT ?
+                    )
+                    RETURNING id, job_id, series_uid, item
+                    """,
+                    [self.worker, limit],
+                ).fetchall()
+                conn.execute(
+                    """
+                    UPDATE jobs SET state = 'running'
+                    WHERE state = 'queued' AND worker = ? AND id IN (
+                        SELECT job_id FROM series_tasks WHERE state = 'planning'
+                    )
+                    """,
+                    [self.worker],
+                )
+        return [
+            {
+                "id": row["id"],
+                "job_id": row["job_id"],
+                "series_uid": row["series_uid"],
+                "item": json.loads(row["item"]),
+            }
+            for row in sorted(rows, key=lambda row: row["id"])
+        ]
+
+    def add_objects(self, series_task_id: int, objects: list[dict]) -> str | None:
+        """Record a series' plan; ``objects`` already on disk count as done.
+
+        Returns the series' final state if nothing is left to transfer.
+        """
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany(
+                    """
+                    INSERT OR IGNORE INTO object_tasks
+                        (series_task_id, key, url, dest_path, size, etag, state)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    [
+                        (
+                            series_task_id,
+                            obj["key"],
+                            obj["url"],
+                            obj["dest_path"],
+                            obj["size"],
+                            obj.get("etag", ""),
+                            obj.get("state", "pending"),
+                        )
+                        for obj in objects
+                    ],
+                )
+                conn.execute(
+                    """
+                    UPDATE series_tasks SET
+                        state = 'downloading',
+                        total_files = ?,
+                        planned_bytes = ?,
+                        started_at = coalesce(started_at, ?)
+                    WHERE id = ?
+                    """,
+                    [
+                        len(objects),
+                        sum(obj["size"] for obj in objects),
+                        _now(),
+                        series_task_id,
+                    ],
+                )
+                return self._settle_series(conn, series_task_id)
+
+    def completed_series(self, series_task_id: int) -> tuple[dict, list[dict]]:
+        """The cart item and objects of a series task, for the local catalog."""
+        with self._lock:
+            conn = self._connection()
+            item = conn.execute(
+                "SELECT item FROM series_tasks WHERE id = ?", [series_task_id]
+            ).fetchone()["item"]
+            rows = conn.execute(
+                """
+                SELECT key, url, dest_path, size, etag FROM object_tasks
+                WHERE series_task_id = ? AND state = 'done'
+                ORDER BY id
+                """,
+                [series_task_id],
+            ).fetchall()
+        return json.loads(item), [dict(row) for row in rows]
+
+    def fail_series(self, series_task_id: int, error: str) -> None:
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    """
+                    UPDATE series_tasks SET state = 'failed', error = ?, finished_at = ?
+                    WHERE id = ?
+                    """,
+                    [error, _now(), series_task_id],
+                )
+                self._settle_job(conn, series_task_id)
+
+    def claim_objects(self, limit: int) -> list[dict]:
+        """Claim up to ``limit`` pending objects, interleaved across series.
+
+        Runs on every completed transfer, so it only looks at the first
+        ``limit`` downloading series that still have pending objects, and at
+        no more than ``limit`` objects of each, whatever the queue holds.
+        """
+        if limit <= 0:
+            return []
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                rows = conn.execute(
+                    f"""
+                    UPDATE object_tasks
+                    SET state = 'running', attempts = attempts + 1
+                    WHERE id IN (
+                        SELECT id FROM (
+                            SELECT
+                                o.id,
+                                row_number() OVER (
+                                    PARTITION BY o.series_task_id ORDER BY o.id
+                                ) AS rank
+                            FROM (
+                                SELECT s.id FROM series_tasks s
+                                WHERE s.state = 'downloading'
+                                  AND s.job_id IN ({_WORKER_JOBS})
+                                  AND EXISTS (
+                                      SELECT 1 FROM object_tasks
+                                      WHERE series_task_id = s.id
+                                        AND state = 'pending'
+                                  )
+                                ORDER BY s.id
+                                LIMIT ?
+                            ) s
+                            JOIN object_tasks o ON o.id IN (
+                                SELECT id FROM object_tasks
+                                WHERE series_task_id = s.id AND state = 'pending'
+                                ORDER BY id
+                                LIMIT ?
+                            )
+                        )
+                        ORDER BY rank, id
+                        LIMIT ?
+                    )
+                    RETURNING
+                        id, series_task_id, key, url, dest_path, size, etag,
+                        (
+                            SELECT series_uid FROM series_tasks
+                            WHERE id = object_tasks.series_task_id
+                        ) AS series_uid
+                    """,
+                    [self.worker, limit, limit, limit],
+                ).fetchall()
+        return [dict(row) for row in rows]
+
+    def finish_object(
+        self, object_id: int, error: str | None = None, transferred: int = 0
+    ) -> str | None:
+        """Mark an object done or failed; returns its series' final state, if any.
+
+        ``transferred`` is the number of bytes actually received over the
+        network for it, which is less than its size after a resume.
+        """
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                row = conn.execute(
+                    """
+                    UPDATE object_tasks SET state = ?, error = ?
+                    WHERE id = ?
+                    RETURNING series_task_id
+                    """,
+                    ["failed" if error else "done", error, object_id],
+                ).fetchone()
+                if row is None:
+                    return None
+                conn.execute(
+                    """
+                    UPDATE series_tasks SET transferred_bytes = transferred_bytes + ?
+                    WHERE id = ?
+                    """,
+                    [transferred, row["series_task_id"]],
+                )
+                return self._settle_series(conn, row["series_task_id"])
+
+    def requeue_object(
+        self, object_id: int, error: str, max_attempts: int, transferred: int = 0
+    ) -> bool:
+        """Send an object back to pending unless it has used up its attempts."""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                row = conn.execute(
+                    """
+                    UPDATE object_tasks SET state = 'pending', error = ?
+                    WHERE id = ? AND attempts < ?
+                    RETURNING series_task_id
+                    """,
+                    [error, object_id, max_attempts],
+                ).fetchone()
+                if row is None:
+                    return False
+                conn.execute(
+                    """
+                    UPDATE series_tasks SET transferred_bytes = transferred_bytes + ?
+                    WHERE id = ?
+                    """,
+                    [transferred, row["series_task_id"]],
+                )
+        return True
+
+    def _settle_series(
+        self, conn: sqlite3.Connection, series_task_id: int
+    ) -> str | None:
+        open_objects, failed = conn.execute(
+            """
+            SELECT
+                count(*) FILTER (WHERE state IN ('pending', 'running')),
+                count(*) FILTER (WHERE state = 'failed')
+            FROM object_tasks
+            WHERE series_task_id = ?
+            """,
+            [series_task_id],
+        ).fetchone()
+        if open_objects:
+            return None
+        state = "failed" if failed else "completed"
+        conn.execute(
+            """
+            UPDATE series_tasks SET state = ?, error = ?, finished_at = ?
+            WHERE id = ? AND state = 'downloading'
+            """,
+            [
+                state,
+                f"{failed} objects failed" if failed else None,
+                _now(),
+                series_task_id,
+            ],
+        )
+        self._settle_job(conn, series_task_id)
+        return state
+
+    def _settle_job(self, conn: sqlite3.Connection, series_task_id: int) -> None:
+        conn.execute(
+            """
+            UPDATE jobs SET
+                state = CASE
+                    WHEN EXISTS (
+                        SELECT 1 FROM series_tasks
+                        WHERE job_id = jobs.id AND state = 'failed'
+                    ) THEN 'failed'
+                    ELSE 'completed'
+                END,
+                finished_at = ?
+            WHERE id = (SELECT job_id FROM series_tasks WHERE id = ?)
+              AND NOT EXISTS (
+                  SELECT 1 FROM series_tasks
+                  WHERE job_id = jobs.id AND state NOT IN ('completed', 'failed')
+              )
+            """,
+            [_now(), series_task_id],
+        )
+
+    def open_job(self, owner: str) -> int | None:
+        """Id of the newest unfinished job queued by ``owner``, if any."""
+        with self._lock:
+            row = self._connection().execute(
+                """
+                SELECT id FROM jobs
+                WHERE owner = ? AND state IN ('queued', 'running')
+                ORDER BY id DESC
+                LIMIT 1
+                """,
+                [owner],
+            ).fetchone()
+        return row["id"] if row else None
+
+    def job_state(self, job_id: int) -> str:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT state FROM jobs WHERE id = ?", [job_id]
+            ).fetchone()
+        return row["state"] if row else ""
+
+    def progress(self, job_id: int | None = None, owner: str = "") -> dict:
+        """Aggregate progress over one job, or ``owner``'s queued and running jobs.
+
+        ``downloading_ids`` lists the series tasks being transferred, so live
+        per-series figures from the engine can be attributed to the owner.
+        """
+        if job_id is None:
+            jobs, params = "j.owner = ? AND j.state IN ('queued', 'running')", [owner]
+        else:
+            jobs, params = "j.id = ?", [job_id]
+        with self._lock:
+            conn = self._connection()
+            series = conn.execute(
+                f"""
+                SELECT
+                    count(*) AS total_series,
+                    count(*) FILTER (WHERE s.state IN ('pending', 'planning'))
+                        AS planning_series,
+                    count(*) FILTER (WHERE s.state IN ('completed', 'failed'))
+                        AS finished_series,
+                    coalesce(sum({PLANNED_BYTES}), 0) AS planned_bytes
+                FROM series_tasks s JOIN jobs j ON j.id = s.job_id
+                WHERE {jobs}
+                """,
+                params,
+            ).fetchone()
+            objects = conn.execute(
+                f"""
+                SELECT
+                    count(*) AS total_files,
+                    count(*) FILTER (WHERE o.state = 'done') AS downloaded_files,
+                    count(*) FILTER (WHERE o.state = 'failed') AS failed_files,
+                    coalesce(sum(o.size) FILTER (WHERE o.state = 'done'), 0)
+                        AS downloaded_bytes
+                FROM object_tasks o
+                JOIN series_tasks s ON s.id = o.series_task_id
+                JOIN jobs j ON j.id = s.job_id
+                WHERE {jobs}
+                """,
+                params,
+            ).fetchone()
+            current = conn.execute(
+                f"""
+                SELECT s.series_uid
+                FROM object_tasks o
+                JOIN series_tasks s ON s.id = o.series_task_id
+                JOIN jobs j ON j.id = s.job_id
+                WHERE {jobs} AND o.state = 'running'
+                ORDER BY o.id
+                LIMIT 1
+                """,
+                params,
+            ).fetchone()
+            downloading = conn.execute(
+                f"""
+                SELECT s.id FROM series_tasks s JOIN jobs j ON j.id = s.job_id
+                WHERE {jobs} AND s.state = 'downloading'
+                """,
+                params,
+            ).fetchall()
+        progress = dict(series) | dict(objects)
+        progress["active"] = progress["total_series"] > 0
+        progress["current_series_uid"] = current["series_uid"] if current else ""
+        progress["downloading_ids"] = {row["id"] for row in downloading}
+        return progress
+
+    def series_progress(
+        self, owner: str, limit: int = SERIES_PROGRESS_LIMIT
+    ) -> list[dict]:
+        """Per-series progress of ``owner``'s active jobs, busiest series first."""
+        with self._lock:
+            rows = self._connection().execute(
+                f"""
+                SELECT
+                    s.id,
+                    s.series_uid,
+                    json_extract(s.item, '$.Collection') AS collection,
+                    s.state,
+                    {PLANNED_BYTES} AS planned_bytes,
+                    s.transferred_bytes,
+                    s.total_files,
+                    coalesce(o.done_files, 0) AS done_files,
+                    coalesce(o.failed_files, 0) AS failed_files,
+                    coalesce(o.done_bytes, 0) AS done_bytes
+                FROM series_tasks s
+                JOIN jobs j ON j.id = s.job_id
+                LEFT JOIN (
+                    SELECT
+                        series_task_id,
+                        count(*) FILTER (WHERE state = 'done') AS done_files,
+                        count(*) FILTER (WHERE state = 'failed') AS failed_files,
+                        sum(size) FILTER (WHERE state = 'done') AS done_bytes
+                    FROM object_tasks
+                    WHERE series_task_id IN (
+                        SELECT s.id FROM series_tasks s JOIN jobs j ON j.id = s.job_id
+                        WHERE j.owner = ? AND j.state IN ('queued', 'running')
+                    )
+                    GROUP BY series_task_id
+                ) o ON o.series_task_id = s.id
+                WHERE j.owner = ? AND j.state IN ('queued', 'running')
+                ORDER BY
+                    CASE s.state
+                        WHEN 'downloading' THEN 0
+                        WHEN 'planning' THEN 1
+                        WHEN 'pending' THEN 2
+                        ELSE 3
+                    END,
+                    s.id
+                LIMIT ?
+                """,
+                [owner, owner, limit],
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def history(self, owner: str, limit: int = HISTORY_LIMIT) -> list[dict]:
+        """``owner``'s most recently completed series, newest first, as cart items.
+
+        Each item carries the final transfer stats: size on disk, bytes
+        actually transferred, file count, duration and average throughput.
+        """
+        with self._lock:
+            rows = self._connection().execute(
+                """
+                SELECT
+                    s.item,
+                    s.finished_at,
+                    s.total_files,
+                    s.planned_bytes,
+                    s.transferred_bytes,
+                    (julianday(s.finished_at) - julianday(s.started_at)) * 86400
+                        AS duration_s
+                FROM series_tasks s JOIN jobs j ON j.id = s.job_id
+                WHERE j.owner = ? AND s.state = 'completed'
+                ORDER BY s.finished_at DESC, s.id DESC
+                LIMIT ?
+                """,
+                [owner, limit],
+            ).fetchall()
+        history = []
+        for row in rows:
+            item = json.loads(row["item"])
+            duration_s = max(row["duration_s"] or 0.0, 0.0)
+            item["downloaded_at"] = row["finished_at"]
+            item["files"] = row["total_files"]
+            item["size_mb"] = round(row["planned_bytes"] / MB, 2)
+            item["transferred_mb"] = round(row["transferred_bytes"] / MB, 2)
+            item["duration_s"] = round(duration_s, 1)
+            item["avg_mb_s"] = (
+                round(row["transferred_bytes"] / MB / duration_s, 2)
+                if duration_s
+                else 0.0
+            )
+            history.append(item)
+        return history
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = self._connection().execute(
+                """
+                SELECT 'series_' || state, count(*) FROM series_tasks GROUP BY state
+                UNION ALL
+                SELECT 'objects_' || state, count(*) FROM object_tasks GROUP BY state
+                """
+            ).fetchall()
+        return {name: count for name, count in rows}
@@ -0,0 +1,156 @@
+import hashlib
+import os
+import re
+import struct
+from pathlib import Path
+
+# Post-download integrity checks. Everything here runs in worker processes,
+# so it only depends on the standard library and plain arguments.
+VERIFY_DOWNLOADS = os.getenv("IDC_VERIFY_DOWNLOADS", "0").lower() in ("1", "true")
+VERIFY_WORKERS = int(
+    os.getenv("IDC_VERIFY_WORKERS", str(max(1, (os.cpu_count() or 2) // 2)))
+)
+VERIFY_ATTEMPTS = int(os.getenv("IDC_VERIFY_ATTEMPTS", "3"))
+CHUNK_SIZE = 1024 * 1024
+
+MD5_ETAG = re.compile(r"^[0-9a-f]{32}$")
+SERIES_INSTANCE_UID = (0x0020, 0x000E)
+ITEM = (0xFFFE, 0xE000)
+ITEM_DELIMITER = (0xFFFE, 0xE00D)
+SEQUENCE_DELIMITER = (0xFFFE, 0xE0DD)
+UNDEFINED_LENGTH = 0xFFFFFFFF
+# Explicit VRs whose elements carry a 4-byte length.
+LONG_VRS = {vr.encode() for vr in "OB OD OF OL OV OW SQ SV UC UN UR UT UV".split()}
+IMPLICIT_VR_LITTLE_ENDIAN = "1.2.840.10008.1.2"
+EXPLICIT_VR_BIG_ENDIAN = "1.2.840.10008.1.2.2"
+DEFLATED_LITTLE_ENDIAN = "1.2.840.10008.1.2.1.99"
+
+
+class _Reader:
+    """Sequential reader for the DICOM data elements of an open Part 10 file."""
+
+    def __init__(self, handle, explicit: bool = True, endian: str = "<"):
+        self.handle = handle
+        self.explicit = explicit
+        self.endian = endian
+
+    def _unpack(self, fmt: str, size: int) -> tuple:
+        data = self.handle.read(size)
+        if len(data) < size:
+            raise EOFError
+        return struct.unpack(self.endian + fmt, data)
+
+    def element(self) -> tuple[tuple[int, int], int]:
+        """Read one element header; returns its tag and value length."""
+        group, elem = self._unpack("HH", 4)
+        if group == 0xFFFE or not self.explicit:
+            return (group, elem), self._unpack("I", 4)[0]
+        vr = self.handle.read(2)
+        if vr in LONG_VRS:
+            self.handle.read(2)
+            return (group, elem), self._unpack("I", 4)[0]
+        return (group, elem), self._unpack("H", 2)[0]
+
+    def value(self, length: int) -> bytes:
+        data = self.handle.read(length)
+        if len(data) < length:
+            raise EOFError
+        return data
+
+    def skip(self, length: int) -> None:
+        if length == UNDEFINED_LENGTH:
+            self._skip_sequence()
+        else:
+            self.handle.seek(length, os.SEEK_CUR)
+
+    def _skip_sequence(self) -> None:
+        while True:
+            tag, length = self.element()
+            if tag == SEQUENCE_DELIMITER:
+                return
+            if tag == ITEM and length == UNDEFINED_LENGTH:
+                self._skip_item()
+            else:
+                self.skip(length)
+
+    def _skip_item(self) -> None:
+        while True:
+            tag, length = self.element()
+            if tag == ITEM_DELIMITER:
+                return
+            self.skip(length)
+
+
+def _text(value: bytes) -> str:
+    return value.decode("ascii", "replace").strip("\x00 ")
+
+
+def read_series_uid(path: Path) -> str | None:
+    """SeriesInstanceUID of a DICOM Part 10 file, or None if it cannot be read.
+
+    Returns an empty string for a transfer syntax this reader does not
+    decode (deflated data sets), as the file may well be fine.
+    """
+    with open(path, "rb") as handle:
+        if handle.read(132)[128:] != b"DICM":
+            return None
+        reader = _Reader(handle)
+        transfer_syntax = ""
+        try:
+            while True:
+                start = handle.tell()
+                tag, length = reader.element()
+                if tag[0] != 0x0002:
+                    handle.seek(start)
+                    break
+                if tag == (0x0002, 0x0010):
+                    transfer_syntax = _text(reader.value(length))
+                else:
+                    reader.skip(length)
+            if transfer_syntax == DEFLATED_LITTLE_ENDIAN:
+                return ""
+            reader.explicit = transfer_syntax != IMPLICIT_VR_LITTLE_ENDIAN
+            reader.endian = ">" if transfer_syntax == EXPLICIT_VR_BIG_ENDIAN else "<"
+            while True:
+                tag, length = reader.element()
+                if tag == SERIES_INSTANCE_UID:
+                    return _text(reader.value(length))
+                if tag > SERIES_INSTANCE_UID:
+                    return None
+                reader.skip(length)
+        except (EOFError, struct.error):
+            return None
+
+
+def file_md5(path: Path) -> str:
+    digest = hashlib.md5()
+    with open(path, "rb") as handle:
+        while chunk := handle.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def verify_object(path: str, size: int, etag: str, series_uid: str) -> str | None:
+    """Check one downloaded object; returns a description of the problem, if any.
+
+    The size and, for single-part uploads (whose ETag is the MD5 of the
+    content), the checksum must match the S3 listing, and DICOM files must
+    belong to ``series_uid`` unless their transfer syntax cannot be decoded.
+    """
+    dest_path = Path(path)
+    try:
+        actual = dest_path.stat().st_size
+        if size and actual != size:
+            return f"size {actual} does not match {size}"
+        etag = etag.strip('"').lower()
+        if MD5_ETAG.match(etag) and file_md5(dest_path) != etag:
+            return "MD5 does not match ETag"
+        if dest_path.suffix.lower() == ".dcm":
+            found = read_series_uid(dest_path)
+            if found is None:
+                return "not a readable DICOM file"
+            if series_uid and found and found != series_uid:
+                return f"belongs to series {found}"
+    except OSError as e:
+        return str(e)
+    return None
@@ -0,0 +1,136 @@
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import duckdb
+
+
+class DuckDBPool:
+    """Process-wide DuckDB database shared through a bounded set of cursors.
+
+    DuckDB cursors are independent connections to the same database, so each
+    thread checks one out for the duration of a query instead of opening a new
+    database (and re-reading Parquet metadata) per request.
+    """
+
+    def __init__(
+        self,
+        database: str = ":memory:",
+        max_cursors: int = 8,
+        read_only: bool = False,
+        init_sql: list[str] | None = None,
+    ):
+        self.database = database
+        self.max_cursors = max_cursors
+        self.read_only = read_only
+        self.init_sql = list(init_sql or [])
+        self._root: duckdb.DuckDBPyConnection | None = None
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stats = {
+            "checkouts": 0,
+            "timeouts": 0,
+            "in_use": 0,
+            "total_wait_s": 0.0,
+            "max_wait_s": 0.0,
+        }
+
+    @property
+    def is_open(self) -> bool:
+        return self._root is not None
+
+    def open(self) -> None:
+        with self._lock:
+            if self._root is not None:
+                return
+            root = duckdb.connect(self.database, read_only=self.read_only)
+            for sql in self.init_sql:
+                root.execute(sql)
+            self._root = root
+            logging.info(
+                "Opened DuckDB pool on %s (max %d cursors)",
+                self.database,
+                self.max_cursors,
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            while True:
+                try:
+                    self._idle.get_nowait().close()
+                except queue.Empty:
+                    break
+            if self._root is not None:
+                self._root.close()
+                self._root = None
+            self._created = 0
+
+    def _checkout(self, timeout: float | None) -> duckdb.DuckDBPyConnection:
+        if self._root is None:
+            self.open()
+        started = time.perf_counter()
+        try:
+            cursor = self._idle.get_nowait()
+        except queue.Empty:
+            cursor = None
+            with self._lock:
+                if self._created < self.max_cursors:
+                    cursor = self._root.cursor()
+                    self._created += 1
+            if cursor is None:
+                try:
+                    cursor = self._idle.get(timeout=timeout)
+                except queue.Empty:
+                    with self._lock:
+                        self._stats["timeouts"] += 1
+                    raise TimeoutError(
+                        f"No DuckDB cursor available after {timeout}s"
+                    ) from None
+        waited = time.perf_counter() - started
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["in_use"] += 1
+            self._stats["total_wait_s"] += waited
+            self._stats["max_wait_s"] = max(self._stats["max_wait_s"], waited)
+        return cursor
+
+    def _checkin(self, cursor: duckdb.DuckDBPyConnection) -> None:
+        with self._lock:
+            self._stats["in_use"] -= 1
+            closed = self._root is None
+        if closed:
+            cursor.close()
+        else:
+            self._idle.put(cursor)
+
+    @contextmanager
+    def connection(self, timeout: float | None = 30.0):
+        held = getattr(self._local, "cursor", None)
+        if held is not None:
+            # Nested checkout on the same thread reuses the cursor it holds.
+            yield held
+            return
+        cursor = self._checkout(timeout)
+        self._local.cursor = cursor
+        try:
+            yield cursor
+        finally:
+            self._local.cursor = None
+            self._checkin(cursor)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["created"] = self._created
+            stats["max_cursors"] = self.max_cursors
+        checkouts = stats["checkouts"]
+        stats["avg_wait_ms"] = (
+            round(stats["total_wait_s"] / checkouts * 1000, 3) if checkouts else 0.0
+        )
+        stats["max_wait_ms"] = round(stats.pop("max_wait_s") * 1000, 3)
+        stats["total_wait_s"] = round(stats["total_wait_s"], 3)
+        return stats
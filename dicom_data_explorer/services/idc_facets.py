@@ -0,0 +1,187 @@
+import json
+import logging
+from pathlib import Path
+
+from dicom_data_explorer.services.idc_index_db import (
+    INDEX_TABLE,
+    INDEX_VERSION,
+    versioned_cache_path,
+)
+from dicom_data_explorer.services.idc_query import SeriesFilter, execute
+
+FACET_COLUMNS = {
+    "collection": "collection_id",
+    "modality": "Modality",
+    "body_part": "BodyPartExamined",
+}
+
+# GROUPING(collection_id, Modality, BodyPartExamined) bitmask -> facet layout.
+_GROUPING_SETS = {
+    3: ("collection", None),
+    5: ("modality", None),
+    6: ("body_part", None),
+    1: ("modality", "collection"),
+    2: ("body_part", "collection"),
+}
+
+
+def facets_path() -> Path:
+    return versioned_cache_path("idc_facets", ".json")
+
+
+def compute_facets(conn) -> dict:
+    """Aggregate series counts and sizes for every facet value in one pass.
+
+    Besides the global lists, modalities and body parts are cross-tabulated
+    per collection so the dropdowns can be narrowed without another scan.
+    """
+    query = f"""
+        SELECT
+            GROUPING(collection_id, Modality, BodyPartExamined) AS grouping_id,
+            collection_id,
+            Modality,
+            BodyPartExamined,
+            count(*) AS series_count,
+            coalesce(sum(series_size_MB), 0) AS total_mb
+        FROM {INDEX_TABLE}
+        GROUP BY GROUPING SETS (
+            (collection_id),
+            (Modality),
+            (BodyPartExamined),
+            (collection_id, Modality),
+            (collection_id, BodyPartExamined)
+        )
+    """
+    facets: dict[str, list[dict]] = {name: [] for name in FACET_COLUMNS}
+    by_collection: dict[str, dict[str, list[dict]]] = {}
+    for grouping_id, collection, modality, body_part, count, total_mb in conn.execute(
+        query
+    ).fetchall():
+        facet, parent = _GROUPING_SETS[grouping_id]
+        value = {"collection": collection, "modality": modality, "body_part": body_part}[
+            facet
+        ]
+        if value is None or (parent and collection is None):
+            continue
+        entry = {
+            "value": value,
+            "series_count": int(count),
+            "total_mb": round(float(total_mb), 2),
+        }
+        if parent:
+            by_collection.setdefault(
+                collection, {"modality": [], "body_part": []}
+            )[facet].append(entry)
+        else:
+            facets[facet].append(entry)
+    for values in facets.values():
+        values.sort(key=lambda entry: entry["value"])
+    for crosstab in by_collection.values():
+        for values in crosstab.values():
+            values.sort(key=lambda entry: entry["value"])
+    return {
+        "version": INDEX_VERSION,
+        "facets": facets,
+        "by_collection": by_collection,
+    }
+
+
+def load_facets(path: Path) -> dict | None:
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            store = json.load(handle)
+    except (OSError, ValueError):
+        return None
+    if store.get("version") != INDEX_VERSION:
+        return None
+    return store
+
+
+def save_facets(path: Path, store: dict) -> None:
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(store, handle)
+        tmp_path.replace(path)
+    except OSError as e:
+        logging.warning("Could not persist IDC facets to %s: %s", path, e)
+
+
+def compute_dependent_facets(
+    conn, selection: SeriesFilter
+) -> dict[str, list[dict]]:
+    """Count the values still reachable for each facet under a selection.
+
+    Every facet is counted against the selections on the *other* facets, so a
+    user can switch e.g. modality without the list collapsing to the current
+    choice. All three facets come from a single GROUPING SETS query.
+    """
+    selected = {
+        "collection": selection.collection,
+        "modality": selection.modality,
+        "body_part": selection.body_part,
+    }
+    matches = {}
+    params: list[str] = []
+    for facet, column in FACET_COLUMNS.items():
+        if selected[facet]:
+            matches[facet] = f"{column} = ?"
+            params.append(selected[facet])
+        else:
+            matches[facet] = "TRUE"
+    aggregates = []
+    for facet in FACET_COLUMNS:
+        others = " AND ".join(
+            f"{other}_ok" for other in FACET_COLUMNS if other != facet
+        )
+        aggregates.append(f"count(*) FILTER (WHERE {others}) AS {facet}_count")
+        aggregates.append(
+            f"coalesce(sum(series_size_MB) FILTER (WHERE {others}), 0) AS {facet}_mb"
+        )
+    query = f"""
+        SELECT
+            GROUPING(collection_id, Modality, BodyPartExamined) AS grouping_id,
+            collection_id,
+            Modality,
+            BodyPartExamined,
+            {", ".join(aggregates)}
+        FROM (
+            SELECT
+                collection_id,
+                Modality,
+                BodyPartExamined,
+                series_size_MB,
+                {matches["collection"]} AS collection_ok,
+                {matches["modality"]} AS modality_ok,
+                {matches["body_part"]} AS body_part_ok
+            FROM {INDEX_TABLE}
+        )
+        WHERE collection_ok::INT + modality_ok::INT + body_part_ok::INT >= 2
+        GROUP BY GROUPING SETS ((collection_id), (Modality), (BodyPartExamined))
+    """
+    facets: dict[str, list[dict]] = {name: [] for name in FACET_COLUMNS}
+    for row in execute(conn, query, params).fetchall():
+        grouping_id, collection, modality, body_part = row[:4]
+        facet, _ = _GROUPING_SETS[grouping_id]
+        value = {"collection": collection, "modality": modality, "body_part": body_part}[
+            facet
+        ]
+        offset = 4 + 2 * list(FACET_COLUMNS).index(facet)
+        count, total_mb = row[offset], row[offset + 1]
+        if value is None or not count:
+            continue
+        facets[facet].append(
+            {
+                "value": value,
+                "series_count": int(count),
+                "total_mb": round(float(total_mb), 2),
+            }
+        )
+    for facet, values in facets.items():
+        value = selected[facet]
+        if value and all(entry["value"] != value for entry in values):
+            # Keep the current choice visible even if nothing else matches it.
+            values.append({"value": value, "series_count": 0, "total_mb": 0.0})
+        values.sort(key=lambda entry: entry["value"])
+    return facets
@@ -0,0 +1,187 @@
+import logging
+import os
+import shutil
+from pathlib import Path
+
+import duckdb
+import idc_index_data as idc_data
+
+PARQUET_PATH = str(idc_data.IDC_INDEX_PARQUET_FILEPATH)
+INDEX_VERSION = str(idc_data.__version__)
+CACHE_DIR = Path(
+    os.getenv("IDC_CACHE_DIR") or "~/.cache/dicom_data_explorer"
+).expanduser()
+INDEX_TABLE = "idc_index"
+# Bump when the materialized layout changes so existing files are rebuilt.
+SCHEMA_VERSION = 4
+# Space-delimited, lowercased text searched by the free-text box. The outer
+# spaces let word-boundary matches use plain substring tests.
+SEARCH_TEXT_EXPR = (
+    "' ' || lower(concat_ws(' ', collection_id, SeriesDescription, "
+    "SeriesInstanceUID, Modality, BodyPartExamined)) || ' '"
+)
+# Free-text terms can also be looked up in an inverted index. A term never
+# contains spaces, so it is a substring of the searchable text exactly when
+# it is a substring of one of its space-separated words, and the tens of
+# thousands of distinct words are far cheaper to scan than every row. UIDs
+# would swell that vocabulary to a word per row and are left out: a term
+# that could occur inside one (only UID characters) is always scanned for.
+# ``text_hits(term)`` returns each matching row with the rank
+# ``SeriesFilter.relevance`` would give it.
+UID_CHARS = frozenset("0123456789.")
+TEXT_HITS_MACRO = """
+    CREATE MACRO text_hits(term) AS TABLE
+    SELECT
+        p.row_id,
+        max(
+            CASE WHEN v.token = term THEN 3
+            WHEN starts_with(v.token, term) THEN 2 ELSE 1 END
+        ) AS rank
+    FROM search_vocab v JOIN search_postings p ON p.token_id = v.token_id
+    WHERE contains(v.token, term)
+    GROUP BY p.row_id
+"""
+# Rows ``text_hits(?)`` reads, taken from the vocabulary.
+TEXT_POSTINGS_QUERY = (
+    "SELECT coalesce(sum(row_count), 0) FROM search_vocab WHERE contains(token, ?)"
+)
+
+
+def versioned_cache_path(stem: str, suffix: str) -> Path:
+    return CACHE_DIR / f"{stem}_{INDEX_VERSION}{suffix}"
+
+
+def index_db_path() -> Path:
+    return versioned_cache_path("idc_index", ".duckdb")
+
+
+def _is_current(path: Path) -> bool:
+    try:
+        conn = duckdb.connect(str(path), read_only=True)
+    except Exception:
+        return False
+    try:
+        row = conn.execute(
+            "SELECT idc_index_data_version, schema_version FROM index_meta LIMIT 1"
+        ).fetchone()
+        return row is not None and row == (INDEX_VERSION, SCHEMA_VERSION)
+    except Exception:
+        return False
+    finally:
+        conn.close()
+
+
+def _build(path: Path) -> None:
+    conn = duckdb.connect(str(path))
+    try:
+        conn.execute("SET enable_progress_bar = false")
+        # Clustered on the filter columns so zone maps prune row groups.
+        conn.execute(
+            f"""
+            CREATE TABLE {INDEX_TABLE} AS
+            SELECT
+                *,
+                {SEARCH_TEXT_EXPR} AS search_text,
+                row_number() OVER (
+                    ORDER BY collection_id, Modality, BodyPartExamined,
+                        SeriesInstanceUID
+                )::INTEGER AS row_id
+            FROM read_parquet(?)
+            ORDER BY row_id
+            """,
+            [PARQUET_PATH],
+        )
+        conn.execute(
+            f"CREATE INDEX {INDEX_TABLE}_series_uid ON {INDEX_TABLE} (SeriesInstanceUID)"
+        )
+        _build_text_index(conn)
+        conn.execute(
+            """
+            CREATE TABLE index_meta AS
+            SELECT
+                ? AS idc_index_data_version,
+                ? AS schema_version,
+                now() AS built_at
+            """,
+            [INDEX_VERSION, SCHEMA_VERSION],
+        )
+        conn.execute("CHECKPOINT")
+    finally:
+        conn.close()
+
+
+def _build_text_index(conn: duckdb.DuckDBPyConnection) -> None:
+    """Inverted index behind ``text_hits`` (see ``TEXT_HITS_MACRO``)."""
+    conn.execute(
+        f"""
+        CREATE TEMP TABLE search_words AS
+        SELECT DISTINCT token, row_id
+        FROM (
+            SELECT
+                unnest(string_split(lower(concat_ws(
+                    ' ', collection_id, SeriesDescription, Modality,
+                    BodyPartExamined
+                )), ' ')) AS token,
+                row_id
+            FROM {INDEX_TABLE}
+        )
+        WHERE token <> ''
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE search_vocab AS
+        SELECT
+            row_number() OVER (ORDER BY token)::INTEGER AS token_id,
+            token,
+            count(*) AS row_count
+        FROM search_words
+        GROUP BY token
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE search_postings AS
+        SELECT v.token_id, w.row_id
+        FROM search_words w JOIN search_vocab v USING (token)
+        ORDER BY v.token_id, w.row_id
+        """
+    )
+    conn.execute("DROP TABLE search_words")
+    conn.execute(TEXT_HITS_MACRO)
+
+
+def _remove_stale() -> None:
+    for stale in CACHE_DIR.glob("idc_*"):
+        if stale.name.split("_")[-1].startswith(f"{INDEX_VERSION}."):
+            continue
+        try:
+            if stale.is_dir():
+                shutil.rmtree(stale)
+            else:
+                stale.unlink()
+        except OSError as e:
+            logging.warning("Could not remove stale IDC index %s: %s", stale, e)
+
+
+def ensure_index_db() -> Path:
+    """Return the local DuckDB copy of the IDC index, building it if needed.
+
+    The database is keyed by the installed ``idc_index_data`` version, so it is
+    only rebuilt after the package is upgraded.
+    """
+    path = index_db_path()
+    if path.exists() and _is_current(path):
+        return path
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.unlink(missing_ok=True)
+    logging.info("Building IDC index database %s from %s", path, PARQUET_PATH)
+    try:
+        _build(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+        tmp_path.with_name(f"{tmp_path.name}.wal").unlink(missing_ok=True)
+    _remove_stale()
+    return path
@@ -0,0 +1,217 @@
+import json
+import logging
+import os
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from urllib.parse import urlparse
+
+import duckdb
+import platformdirs
+
+from dicom_data_explorer.services.idc_index_db import INDEX_VERSION, versioned_cache_path
+from dicom_data_explorer.services.s3_downloader import get_downloader
+
+# Instance-level indices fetched by idc-index (IDCClient.fetch_index) land in
+# this versioned directory; any of them carrying per-file UUIDs and sizes can
+# stand in for an S3 listing.
+INSTANCE_INDEX_DIR = Path(
+    os.getenv("IDC_INSTANCE_INDEX_DIR")
+    or platformdirs.user_data_dir("idc_index_data", "IDC", version=INDEX_VERSION)
+)
+INSTANCE_INDEX_COLUMNS = {"SeriesInstanceUID", "crdc_instance_uuid", "instance_size"}
+
+
+def manifest_dir() -> Path:
+    return versioned_cache_path("idc_manifests", ".d")
+
+
+def _normalize_s3_prefix(prefix: str) -> str:
+    cleaned = prefix.replace("*", "")
+    return cleaned
+
+
+def parse_s3_url(series_aws_url: str) -> tuple[str, str]:
+    if not series_aws_url:
+        raise ValueError("Missing series_aws_url for IDC download")
+    parsed = urlparse(series_aws_url)
+    if parsed.scheme == "s3":
+        bucket = parsed.netloc
+        prefix = _normalize_s3_prefix(parsed.path.lstrip("/"))
+        return bucket, prefix
+    if parsed.scheme in {"http", "https"}:
+        host = parsed.netloc
+        if host.endswith(".s3.amazonaws.com"):
+            bucket = host.split(".s3.amazonaws.com")[0]
+            prefix = _normalize_s3_prefix(parsed.path.lstrip("/"))
+            return bucket, prefix
+        if host == "s3.amazonaws.com":
+            path_parts = parsed.path.lstrip("/").split("/", 1)
+            bucket = path_parts[0]
+            prefix = _normalize_s3_prefix(path_parts[1] if len(path_parts) > 1 else "")
+            return bucket, prefix
+    raise ValueError(f"Unsupported series_aws_url format: {series_aws_url}")
+
+
+def list_s3_objects(bucket: str, prefix: str) -> list[dict]:
+    objects: list[dict] = []
+    continuation: str | None = None
+    while True:
+        params = {"list-type": "2", "prefix": prefix}
+        if continuation:
+            params["continuation-token"] = continuation
+        response = get_downloader().session.get(
+            f"https://{bucket}.s3.amazonaws.com",
+            params=params,
+            timeout=(10, 120),
+        )
+        response.raise_for_status()
+        root = ET.fromstring(response.text)
+        for node in root.findall(".//{*}Contents"):
+            key = node.findtext("{*}Key")
+            if key:
+                objects.append(
+                    {
+                        "key": key,
+                        "size": int(node.findtext("{*}Size") or 0),
+                        "etag": (node.findtext("{*}ETag") or "").strip('"'),
+                    }
+                )
+        token_node = root.find(".//{*}NextContinuationToken")
+        if token_node is None or not token_node.text:
+            break
+        continuation = token_node.text
+    return objects
+
+
+def _manifest(bucket: str, prefix: str, objects: list[dict], source: str) -> dict:
+    return {
+        "bucket": bucket,
+        "prefix": prefix,
+        "objects": objects,
+        "total_bytes": sum(obj["size"] for obj in objects),
+        "source": source,
+    }
+
+
+def load_cached_manifest(series_uid: str) -> dict | None:
+    path = manifest_dir() / f"{series_uid}.json"
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+
+def save_manifest(series_uid: str, manifest: dict) -> None:
+    path = manifest_dir() / f"{series_uid}.json"
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(manifest, handle)
+        tmp_path.replace(path)
+    except OSError as e:
+        logging.warning("Could not cache IDC manifest %s: %s", path, e)
+
+
+def _instance_index_files() -> list[str]:
+    files = []
+    for path in sorted(INSTANCE_INDEX_DIR.glob("*instance_index.parquet")):
+        try:
+            columns = {
+                row[0]
+                for row in duckdb.execute(
+                    "SELECT name FROM parquet_schema(?)", [str(path)]
+                ).fetchall()
+            }
+        except Exception as e:
+            logging.warning("Skipping unreadable instance index %s: %s", path, e)
+            continue
+        if INSTANCE_INDEX_COLUMNS <= columns:
+            files.append(str(path))
+    return files
+
+
+def index_manifests(series: dict[str, str]) -> dict[str, dict]:
+    """Build manifests for ``series`` (UID -> series_aws_url) from local indices.
+
+    Object keys are derived as ``<series prefix><crdc_instance_uuid>.dcm``, the
+    layout IDC uses in its public buckets. Series not covered by any
+    installed instance-level index are left out.
+    """
+    files = _instance_index_files()
+    if not files or not series:
+        return {}
+    conn = duckdb.connect()
+    try:
+        rows = conn.execute(
+            """
+            SELECT SeriesInstanceUID, crdc_instance_uuid, instance_size
+            FROM read_parquet(?, union_by_name = true)
+            WHERE SeriesInstanceUID IN (SELECT unnest(?))
+            ORDER BY SeriesInstanceUID, crdc_instance_uuid
+            """,
+            [files, list(series)],
+        ).fetchall()
+    finally:
+        conn.close()
+    objects: dict[str, list[tuple]] = {}
+    for series_uid, instance_uuid, size in rows:
+        objects.setdefault(series_uid, []).append((instance_uuid, size))
+    manifests = {}
+    for series_uid, instances in objects.items():
+        bucket, prefix = parse_s3_url(series[series_uid])
+        manifests[series_uid] = _manifest(
+            bucket,
+            prefix,
+            [
+                {"key": f"{prefix}{uuid}.dcm", "size": int(size or 0), "etag": ""}
+                for uuid, size in instances
+            ],
+            "index",
+        )
+    return manifests
+
+
+def list_manifest(series_uid: str, series_aws_url: str) -> dict:
+    """Build a manifest from an S3 listing and cache it."""
+    bucket, prefix = parse_s3_url(series_aws_url)
+    objects = [
+        obj for obj in list_s3_objects(bucket, prefix) if not obj["key"].endswith("/")
+    ]
+    if not objects:
+        raise ValueError(f"No objects found for IDC series at {series_aws_url}")
+    manifest = _manifest(bucket, prefix, objects, "s3")
+    save_manifest(series_uid, manifest)
+    return manifest
+
+
+def resolve_manifests(series: dict[str, str]) -> tuple[dict[str, dict], list[str]]:
+    """Resolve manifests from the disk cache and local indices only.
+
+    Returns the resolved manifests and the UIDs that still need an S3 listing
+    (see :func:`list_manifest`).
+    """
+    resolved: dict[str, dict] = {}
+    for series_uid in series:
+        manifest = load_cached_manifest(series_uid)
+        if manifest is not None:
+            resolved[series_uid] = manifest
+    missing = {uid: url for uid, url in series.items() if uid not in resolved}
+    try:
+        from_index = index_manifests(missing)
+    except Exception as e:
+        logging.exception(f"Error reading IDC instance indices: {e}")
+        from_index = {}
+    for series_uid, manifest in from_index.items():
+        save_manifest(series_uid, manifest)
+        resolved[series_uid] = manifest
+    return resolved, [uid for uid in series if uid not in resolved]
+
+
+def resolve_manifest(series_uid: str, series_aws_url: str) -> dict:
+    """Return the manifest for one series, listing S3 only as a last resort."""
+    resolved, missing = resolve_manifests({series_uid: series_aws_url})
+    if not missing:
+        return resolved[series_uid]
+    return list_manifest(series_uid, series_aws_url)
@@ -0,0 +1,143 @@
+import functools
+from dataclasses import dataclass, replace
+
+import duckdb
+
+from dicom_data_explorer.services.idc_index_db import INDEX_TABLE, UID_CHARS
+
+MAX_SEARCH_TERMS = 8
+STATEMENT_CACHE_SIZE = 512
+
+
+@dataclass(frozen=True)
+class SeriesFilter:
+    """Normalized IDC series filter shared by searches and facet queries.
+
+    The SQL a filter produces depends only on which fields are set and how
+    many (indexed) terms it has (its shape), never on their values, which are
+    always bound as parameters.
+    With ``indexed`` the terms the index covers are looked up through
+    ``text_hits`` instead of scanning ``search_text``; either way the same
+    rows match. The caller decides when the index pays.
+    """
+
+    collection: str = ""
+    modality: str = ""
+    body_part: str = ""
+    text: str = ""
+    min_images: int | None = None
+    max_images: int | None = None
+
+    def __post_init__(self):
+        object.__setattr__(self, "text", " ".join(self.terms()))
+
+    def terms(self) -> list[str]:
+        terms: list[str] = []
+        for term in self.text.lower().split():
+            if term not in terms:
+                terms.append(term)
+        return terms[:MAX_SEARCH_TERMS]
+
+    def indexed_terms(self) -> list[str]:
+        """Terms ``text_hits`` answers exactly: any that cannot occur in a UID."""
+        return [term for term in self.terms() if not set(term) <= UID_CHARS]
+
+    def facet_selection(self) -> "SeriesFilter":
+        return SeriesFilter(self.collection, self.modality, self.body_part)
+
+    def is_empty(self) -> bool:
+        return self == SeriesFilter()
+
+    def conditions(self, indexed: bool = False) -> tuple[list[str], list]:
+        conditions: list[str] = []
+        params: list = []
+        for column, value in (
+            ("collection_id", self.collection),
+            ("Modality", self.modality),
+            ("BodyPartExamined", self.body_part),
+        ):
+            if value:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        indexed_terms = self.indexed_terms() if indexed else []
+        for term in self.terms():
+            if term in indexed_terms:
+                conditions.append("row_id IN (SELECT row_id FROM text_hits(?))")
+            else:
+                conditions.append("contains(search_text, ?)")
+            params.append(term)
+        if self.min_images is not None:
+            conditions.append("coalesce(instanceCount, 0) >= ?")
+            params.append(self.min_images)
+        if self.max_images is not None:
+            conditions.append("coalesce(instanceCount, 0) <= ?")
+            params.append(self.max_images)
+        return conditions, params
+
+    def where(self, indexed: bool = False) -> tuple[str, list]:
+        conditions, params = self.conditions(indexed)
+        return " AND ".join(conditions) or "TRUE", params
+
+    def relevance(self) -> tuple[str, list]:
+        """Score whole-word hits above word-prefix hits above plain substrings."""
+        ranks = []
+        params: list = []
+        for term in self.terms():
+            ranks.append(
+                "CASE WHEN contains(search_text, ?) THEN 3 "
+                "WHEN contains(search_text, ?) THEN 2 ELSE 1 END"
+            )
+            params.extend([f" {term} ", f" {term}"])
+        return (" + ".join(ranks) or "0"), params
+
+    def matches(self, indexed: bool = False) -> tuple[str, list]:
+        """Matching rows of the index with a ``relevance`` column added."""
+        terms = self.indexed_terms() if indexed else []
+        if terms:
+            # Rank each row once per indexed term, keep the rows every one of
+            # them hit and sum their ranks; only the remaining terms (if any)
+            # read search_text.
+            hits = " UNION ALL ".join(
+                f"SELECT {i} AS term, row_id, rank FROM text_hits(?)"
+                for i in range(len(terms))
+            )
+            scanned = replace(
+                self, text=" ".join(t for t in self.terms() if t not in terms)
+            )
+            where_clause, params = scanned.where()
+            relevance, relevance_params = scanned.relevance()
+            query = f"""
+                SELECT i.*, h.relevance + {relevance} AS relevance
+                FROM {INDEX_TABLE} i JOIN (
+                    SELECT row_id, sum(rank)::INTEGER AS relevance
+                    FROM (
+                        SELECT term, row_id, max(rank) AS rank
+                        FROM ({hits})
+                        GROUP BY term, row_id
+                    )
+                    GROUP BY row_id
+                    HAVING count(*) = {len(terms)}
+                ) h ON h.row_id = i.row_id
+                WHERE {where_clause}
+            """
+            return query, relevance_params + terms + params
+        where_clause, params = self.where()
+        relevance, relevance_params = self.relevance()
+        query = (
+            f"SELECT *, {relevance} AS relevance FROM {INDEX_TABLE} "
+            f"WHERE {where_clause}"
+        )
+        return query, relevance_params + params
+
+
+@functools.lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def prepared(query: str) -> duckdb.Statement:
+    """Parse ``query`` once; the parsed statement is reused on every cursor."""
+    statements = duckdb.extract_statements(query)
+    if len(statements) != 1:
+        raise ValueError("Expected exactly one SQL statement")
+    return statements[0]
+
+
+def execute(conn, query: str, params: list | None = None):
+    return conn.execute(prepared(query), params or [])
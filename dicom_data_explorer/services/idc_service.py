@@ -1,20 +1,224 @@
-import duckdb
+import asyncio
+import base64
+import contextlib
+import functools
+import json
 import logging
-import idc_index_data as idc_data
+import os
+import threading
+import uuid
+from dataclasses import replace
+
+import duckdb
+
+from dicom_data_explorer.services.duckdb_pool import DuckDBPool
+from dicom_data_explorer.services.idc_query import SeriesFilter, execute
+from dicom_data_explorer.services.query_executor import QueryExecutor
+from dicom_data_explorer.services.result_cache import ResultCache
+from dicom_data_explorer.services.idc_facets import (
+    FACET_COLUMNS,
+    compute_dependent_facets,
+    compute_facets,
+    facets_path,
+    load_facets,
+    save_facets,
+)
+from dicom_data_explorer.services.idc_index_db import (
+    INDEX_TABLE,
+    INDEX_VERSION,
+    PARQUET_PATH,
+    SEARCH_TEXT_EXPR,
+    TEXT_POSTINGS_QUERY,
+    ensure_index_db,
+    versioned_cache_path,
+)
+
+DB_POOL_SIZE = int(os.getenv("IDC_DB_POOL_SIZE", "8"))
+FACET_CACHE_SIZE = 256
+# Rows between the cursors kept for jumping straight to a deep page.
+PAGE_CHECKPOINT_ROWS = 1000
+# Text terms are looked up in the index only while their postings stay under
+# this share of the rows the other filters leave; past that a scan is cheaper.
+TEXT_INDEX_MAX_SHARE = 0.1
+# Null-free sort keys so keyset comparisons stay total.
+SORT_KEYS = {
+    "SeriesDate": "coalesce(SeriesDate, '')",
+    "ImageCount": "coalesce(instanceCount, 0)",
+    "Modality": "coalesce(Modality, '')",
+    "Relevance": "relevance",
+}
+QUERY_WORKERS = int(
+    os.getenv("IDC_QUERY_WORKERS") or min(DB_POOL_SIZE, os.cpu_count() or 4)
+)
+QUERY_TIMEOUT_S = float(os.getenv("IDC_QUERY_TIMEOUT_S", "30"))
+RESULT_CACHE_MB = float(os.getenv("IDC_RESULT_CACHE_MB", "64"))
+RESULT_CACHE_TTL_S = float(os.getenv("IDC_RESULT_CACHE_TTL_S", "600"))
+RESULT_CACHE_DISK_MB = float(os.getenv("IDC_RESULT_CACHE_DISK_MB", "0"))
+SERIES_COLUMNS = """
+    SeriesInstanceUID,
+    collection_id as Collection,
+    Modality,
+    BodyPartExamined,
+    SeriesDate,
+    SeriesDescription,
+    instanceCount as ImageCount,
+    series_size_MB,
+    series_aws_url
+"""
+FACET_LABELS = {
+    "collection": "Collection",
+    "modality": "Modality",
+    "body_part": "BodyPartExamined",
+}
 
-PARQUET_PATH = str(idc_data.IDC_INDEX_PARQUET_FILEPATH)
+_pool: DuckDBPool | None = None
+_pool_lock = threading.Lock()
+_text_indexed = False
+_facet_store: dict | None = None
+_facet_lock = threading.Lock()
+_inflight: dict[str, duckdb.DuckDBPyConnection] = {}
+_inflight_lock = threading.Lock()
+# DuckDB defaults to one thread per core; more workers than that (or than
+# pooled cursors) would only queue inside DuckDB instead of here.
+_executor = QueryExecutor(max_workers=QUERY_WORKERS)
+# Shared by every session; spilled pages live next to the versioned index so
+# an idc-index-data upgrade leaves them behind with the old database.
+_result_cache = ResultCache(
+    max_bytes=int(RESULT_CACHE_MB * 1024 * 1024),
+    ttl_s=RESULT_CACHE_TTL_S,
+    disk_dir=versioned_cache_path("idc_results", ".d") if RESULT_CACHE_DISK_MB else None,
+    max_disk_bytes=int(RESULT_CACHE_DISK_MB * 1024 * 1024),
+)
+
+
+def _create_pool() -> DuckDBPool:
+    global _text_indexed
+    try:
+        db_path = ensure_index_db()
+        pool = DuckDBPool(str(db_path), max_cursors=DB_POOL_SIZE, read_only=True)
+        _text_indexed = True
+        return pool
+    except Exception as e:
+        logging.exception(f"Error building IDC index database, scanning Parquet: {e}")
+        _text_indexed = False
+        return DuckDBPool(
+            max_cursors=DB_POOL_SIZE,
+            init_sql=[
+                "SET parquet_metadata_cache = true",
+                f"CREATE VIEW {INDEX_TABLE} AS SELECT *, {SEARCH_TEXT_EXPR} AS search_text "
+                f"FROM read_parquet('{PARQUET_PATH}')",
+            ],
+        )
+
+
+def open_db_pool() -> DuckDBPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = _create_pool()
+        pool = _pool
+    pool.open()
+    return pool
 
 
 def get_db_connection():
-    return duckdb.connect()
+    pool = _pool if _pool is not None and _pool.is_open else open_db_pool()
+    return pool.connection()
+
+
+def close_db_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
+
+
+def db_pool_stats() -> dict:
+    return _pool.stats() if _pool is not None else {}
+
+
+def query_executor_stats() -> dict:
+    return _executor.stats()
+
+
+def result_cache_stats() -> dict:
+    return _result_cache.stats()
+
+
+@contextlib.asynccontextmanager
+async def db_lifespan():
+    """Open the shared DuckDB pool and query executor with the app."""
+    _executor.start()
+    await _executor.run(open_db_pool)
+    await _executor.run(get_facet_store)
+    try:
+        yield
+    finally:
+        logging.info("IDC DuckDB pool stats at shutdown: %s", db_pool_stats())
+        logging.info("IDC query executor stats at shutdown: %s", query_executor_stats())
+        logging.info("IDC result cache stats at shutdown: %s", result_cache_stats())
+        _executor.shutdown()
+        close_db_pool()
+
+
+def fetch_records(result) -> list[dict]:
+    """Turn a DuckDB result into row dicts with NULLs as empty strings.
+
+    Columns come out of DuckDB as NumPy arrays and are written into the row
+    dicts one at a time, each array dropped once copied, so only a single
+    column is ever held twice; no DataFrame or per-row Series is built.
+    """
+    columns = result.fetchnumpy()
+    if not columns:
+        return []
+    records = [{} for _ in range(len(next(iter(columns.values()))))]
+    for name in list(columns):
+        for record, value in zip(records, columns.pop(name).tolist()):
+            record[name] = "" if value is None else value
+    return records
+
+
+def get_facet_store() -> dict:
+    """Return facet values and counts, computed once per index version."""
+    global _facet_store
+    if _facet_store is not None:
+        return _facet_store
+    with _facet_lock:
+        if _facet_store is None:
+            path = facets_path()
+            store = load_facets(path)
+            if store is None:
+                with get_db_connection() as conn:
+                    store = compute_facets(conn)
+                save_facets(path, store)
+            _facet_store = store
+    return _facet_store
+
+
+def _facet_values(facet: str, collection: str = "") -> list[dict]:
+    store = get_facet_store()
+    if collection:
+        crosstab = store["by_collection"].get(collection, {})
+        return crosstab.get(facet, [])
+    return store["facets"][facet]
+
+
+def _facet_rows(facet: str, entries: list[dict]) -> list[dict]:
+    label = FACET_LABELS[facet]
+    return [
+        {
+            label: entry["value"],
+            "series_count": entry["series_count"],
+            "total_mb": entry["total_mb"],
+        }
+        for entry in entries
+    ]
 
 
 def fetch_collections() -> list[dict]:
     try:
-        conn = get_db_connection()
-        query = f"\n            SELECT DISTINCT collection_id\n            FROM '{PARQUET_PATH}'\n            WHERE collection_id IS NOT NULL\n            ORDER BY collection_id\n        "
-        df = conn.execute(query).fetchdf()
-        return [{"Collection": row["collection_id"]} for _, row in df.iterrows()]
+        return _facet_rows("collection", _facet_values("collection"))
     except Exception as e:
         logging.exception(f"Error fetching IDC collections: {e}")
         return []
@@ -22,13 +226,7 @@ def fetch_collections() -> list[dict]:
 
 def fetch_modalities(collection: str = "") -> list[dict]:
     try:
-        conn = get_db_connection()
-        where_clause = "WHERE Modality IS NOT NULL"
-        if collection:
-            where_clause += f" AND collection_id = '{collection}'"
-        query = f"\n            SELECT DISTINCT Modality\n            FROM '{PARQUET_PATH}'\n            {where_clause}\n            ORDER BY Modality\n        "
-        df = conn.execute(query).fetchdf()
-        return [{"Modality": row["Modality"]} for _, row in df.iterrows()]
+        return _facet_rows("modality", _facet_values("modality", collection))
     except Exception as e:
         logging.exception(f"Error fetching IDC modalities: {e}")
         return []
@@ -36,37 +234,499 @@ def fetch_modalities(collection: str = "") -> list[dict]:
 
 def fetch_body_parts(collection: str = "") -> list[dict]:
     try:
-        conn = get_db_connection()
-        where_clause = "WHERE BodyPartExamined IS NOT NULL"
-        if collection:
-            where_clause += f" AND collection_id = '{collection}'"
-        query = f"\n            SELECT DISTINCT BodyPartExamined\n            FROM '{PARQUET_PATH}'\n            {where_clause}\n            ORDER BY BodyPartExamined\n        "
-        df = conn.execute(query).fetchdf()
-        return [
-            {"BodyPartExamined": row["BodyPartExamined"]} for _, row in df.iterrows()
-        ]
+        return _facet_rows("body_part", _facet_values("body_part", collection))
     except Exception as e:
         logging.exception(f"Error fetching IDC body parts: {e}")
         return []
 
 
-def fetch_series(
-    collection: str = "", modality: str = "", body_part: str = "", limit: int = 1000
-) -> list[dict]:
+@functools.lru_cache(maxsize=FACET_CACHE_SIZE)
+def _dependent_facets(selection: SeriesFilter) -> dict[str, list[dict]]:
+    with get_db_connection() as conn:
+        return compute_dependent_facets(conn, selection)
+
+
+def fetch_facet_counts(filters: SeriesFilter = SeriesFilter()) -> dict[str, list[dict]]:
+    """Return the values (with counts) still valid for each facet."""
     try:
-        conn = get_db_connection()
-        conditions = ["1=1"]
-        if collection:
-            conditions.append(f"collection_id = '{collection}'")
-        if modality:
-            conditions.append(f"Modality = '{modality}'")
-        if body_part:
-            conditions.append(f"BodyPartExamined = '{body_part}'")
-        where_clause = " AND ".join(conditions)
-        query = f"\n            SELECT \n                SeriesInstanceUID,\n                collection_id as Collection,\n                Modality,\n                BodyPartExamined,\n                SeriesDate,\n                SeriesDescription,\n                instanceCount as ImageCount,\n                series_size_MB,\n                series_aws_url\n            FROM '{PARQUET_PATH}'\n            WHERE {where_clause}\n            LIMIT {limit}\n        "
-        df = conn.execute(query).fetchdf()
-        df = df.fillna("")
-        return df.to_dict(orient="records")
+        selection = filters.facet_selection()
+        if selection.is_empty():
+            facets = get_facet_store()["facets"]
+        else:
+            facets = _dependent_facets(selection)
+        return {facet: _facet_rows(facet, facets[facet]) for facet in FACET_COLUMNS}
+    except Exception as e:
+        logging.exception(f"Error fetching IDC facet counts: {e}")
+        return {}
+
+
+def fetch_series(filters: SeriesFilter = SeriesFilter(), limit: int = 1000) -> list[dict]:
+    """Matching series in UID order, so a limited run always gets the same set."""
+    try:
+        with get_db_connection() as conn:
+            where_clause, params = filters.where(_use_text_index(conn, filters))
+            query = f"""
+                SELECT {SERIES_COLUMNS}
+                FROM {INDEX_TABLE}
+                WHERE {where_clause}
+                ORDER BY SeriesInstanceUID
+                LIMIT ?
+            """
+            return fetch_records(execute(conn, query, params + [limit]))
     except Exception as e:
         logging.exception(f"Error fetching IDC series: {e}")
-        return []
\ No newline at end of file
+        return []
+
+
+@contextlib.contextmanager
+def _cancellable(conn, query_key: str):
+    """Register ``conn`` under ``query_key``, interrupting the query it replaces.
+
+    Interrupts happen under ``_inflight_lock``, and a cursor is unregistered
+    under the same lock before it goes back to the pool, so a registered
+    cursor is always still held by the query being interrupted.
+    """
+    if not query_key:
+        yield
+        return
+    with _inflight_lock:
+        previous = _inflight.get(query_key)
+        _inflight[query_key] = conn
+        if previous is not None and previous is not conn:
+            previous.interrupt()
+    try:
+        yield
+    finally:
+        with _inflight_lock:
+            if _inflight.get(query_key) is conn:
+                del _inflight[query_key]
+
+
+def cancel_query(query_key: str) -> None:
+    with _inflight_lock:
+        conn = _inflight.pop(query_key, None)
+        if conn is not None:
+            conn.interrupt()
+
+
+def encode_cursor(sort_value, series_uid: str) -> str:
+    payload = json.dumps([sort_value, series_uid], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple:
+    sort_value, series_uid = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return sort_value, series_uid
+
+
+def _use_text_index(conn, filters: SeriesFilter) -> bool:
+    """Whether ``filters``' text terms are cheaper to look up than to scan for.
+
+    Selective terms touch a few postings and skip the scan entirely; common
+    ones (``ct``, a single letter), or any term once a facet has narrowed the
+    scan, hit so large a share of the rows that scanning wins. A term that
+    could be part of a UID has to be scanned for, and then so are the rest.
+    """
+    terms = filters.indexed_terms()
+    if not terms or len(terms) < len(filters.terms()) or not _text_indexed:
+        return False
+    cache_key = json.dumps(["postings", INDEX_VERSION, terms])
+    postings = _result_cache.get(cache_key)
+    if postings is None:
+        postings = sum(
+            execute(conn, TEXT_POSTINGS_QUERY, [term]).fetchone()[0]
+            for term in terms
+        )
+        _result_cache.put(cache_key, postings)
+    scanned = _match_count(conn, *replace(filters, text="").matches())
+    return postings <= scanned * TEXT_INDEX_MAX_SHARE
+
+
+def _match_count(conn, matches_query: str, params: list) -> int:
+    """Number of rows ``matches_query`` returns, cached with the results."""
+    cache_key = json.dumps(["count", INDEX_VERSION, matches_query, params])
+    total = _result_cache.get(cache_key)
+    if total is None:
+        total = execute(
+            conn, f"SELECT count(*) FROM ({matches_query})", params
+        ).fetchone()[0]
+        _result_cache.put(cache_key, total)
+    return int(total)
+
+
+def _page_checkpoints(
+    conn, matches_query: str, params: list, sort_key: str, direction: str
+) -> list:
+    """Sort key and UID of every ``PAGE_CHECKPOINT_ROWS``-th row of a query.
+
+    Only built when someone jumps to a deep page without a cursor; such a
+    page is then a keyset seek from the checkpoint before it plus a short
+    OFFSET. Cached with the results, so it is byte-bounded and expires.
+    """
+    cache_key = json.dumps(
+        ["checkpoints", INDEX_VERSION, matches_query, params, sort_key, direction]
+    )
+    checkpoints = _result_cache.get(cache_key)
+    if checkpoints is None:
+        query = f"""
+            SELECT sort_key, SeriesInstanceUID
+            FROM (
+                SELECT
+                    {sort_key} AS sort_key,
+                    SeriesInstanceUID,
+                    row_number() OVER (
+                        ORDER BY {sort_key} {direction}, SeriesInstanceUID {direction}
+                    ) AS row_number
+                FROM ({matches_query})
+            )
+            WHERE row_number % ? = 0
+            ORDER BY row_number
+        """
+        rows = execute(conn, query, params + [PAGE_CHECKPOINT_ROWS]).fetchall()
+        checkpoints = [[row[0], row[1]] for row in rows]
+        _result_cache.put(cache_key, checkpoints)
+    return checkpoints
+
+
+def _keyset_condition(direction: str, backward: bool) -> str:
+    forward_op = ">" if direction == "ASC" else "<"
+    op = {"<": ">", ">": "<"}[forward_op] if backward else forward_op
+    return f"(sort_key {op} ? OR (sort_key = ? AND SeriesInstanceUID {op} ?))"
+
+
+_EMPTY_PAGE = {
+    "rows": [],
+    "total": 0,
+    "next_cursor": "",
+    "prev_cursor": "",
+    "cancelled": False,
+    "timed_out": False,
+}
+
+
+def _result_cache_key(
+    filters: SeriesFilter,
+    sort_field: str,
+    sort_direction: str,
+    page: int,
+    page_size: int,
+    after: str,
+    before: str,
+) -> str:
+    # SeriesFilter is already normalized, so equivalent searches share a key.
+    if after or before:
+        page = 0
+    return json.dumps(
+        [
+            INDEX_VERSION,
+            repr(filters),
+            sort_field if sort_field in SORT_KEYS else "SeriesDate",
+            "asc" if sort_direction == "asc" else "desc",
+            page,
+            page_size,
+            after,
+            before,
+        ]
+    )
+
+
+def search_series(
+    filters: SeriesFilter = SeriesFilter(),
+    sort_field: str = "SeriesDate",
+    sort_direction: str = "desc",
+    page: int = 1,
+    page_size: int = 10,
+    after: str = "",
+    before: str = "",
+    query_key: str = "",
+) -> dict:
+    """Return one page of matching series with cursors to its neighbours.
+
+    Filtering and sorting run in DuckDB and pages are reached by keyset
+    seeks: ``after``/``before`` continue from a cursor returned earlier, and
+    ``page`` jumps from the nearest of a sparse set of cached checkpoints, so
+    deep pages cost about the same as the first one. Only ``page_size`` rows
+    are returned.
+
+    A newer search with the same ``query_key`` interrupts this one, in which
+    case ``cancelled`` is set on the result. Completed pages are served from
+    the shared result cache until they expire or the index is upgraded.
+    """
+    empty = dict(_EMPTY_PAGE)
+    cache_key = _result_cache_key(
+        filters, sort_field, sort_direction, page, page_size, after, before
+    )
+    cached = _result_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    try:
+        result = _query_page(
+            filters, sort_field, sort_direction, page, page_size, after, before, query_key
+        )
+    except duckdb.InterruptException:
+        logging.info("IDC search %s superseded by a newer query", query_key)
+        return dict(empty, cancelled=True)
+    except Exception as e:
+        logging.exception(f"Error searching IDC series: {e}")
+        return empty
+    _result_cache.put(cache_key, result)
+    return result
+
+
+def _query_page(
+    filters: SeriesFilter,
+    sort_field: str,
+    sort_direction: str,
+    page: int,
+    page_size: int,
+    after: str,
+    before: str,
+    query_key: str,
+) -> dict:
+    empty = dict(_EMPTY_PAGE)
+    sort_key = SORT_KEYS.get(sort_field, SORT_KEYS["SeriesDate"])
+    direction = "ASC" if sort_direction == "asc" else "DESC"
+    backward = bool(before) and not after
+    cursor = after or before
+    seek_params: list = []
+    seek_clause = "TRUE"
+    offset = 0
+    order = direction
+    if backward:
+        order = "DESC" if direction == "ASC" else "ASC"
+    with get_db_connection() as conn, _cancellable(conn, query_key):
+        matches_query, params = filters.matches(_use_text_index(conn, filters))
+        total = _match_count(conn, matches_query, params)
+        if total == 0:
+            return empty
+        page = min(page, (total + page_size - 1) // page_size)
+        seek = decode_cursor(cursor) if cursor else None
+        if seek is None and page > 1:
+            offset = (page - 1) * page_size
+            if offset >= PAGE_CHECKPOINT_ROWS:
+                checkpoints = _page_checkpoints(
+                    conn, matches_query, params, sort_key, direction
+                )
+                seek = checkpoints[offset // PAGE_CHECKPOINT_ROWS - 1]
+                offset %= PAGE_CHECKPOINT_ROWS
+        if seek is not None:
+            sort_value, series_uid = seek
+            seek_clause = _keyset_condition(direction, backward)
+            seek_params = [sort_value, sort_value, series_uid]
+        # Pick the page from the sort keys alone, then fetch its full rows.
+        query = f"""
+            SELECT {SERIES_COLUMNS}, sort_key
+            FROM {INDEX_TABLE} JOIN (
+                SELECT SeriesInstanceUID, sort_key
+                FROM (
+                    SELECT SeriesInstanceUID, {sort_key} AS sort_key
+                    FROM ({matches_query})
+                )
+                WHERE {seek_clause}
+                ORDER BY sort_key {order}, SeriesInstanceUID {order}
+                LIMIT ? OFFSET ?
+            ) USING (SeriesInstanceUID)
+            ORDER BY sort_key {order}, SeriesInstanceUID {order}
+        """
+        records = fetch_records(
+            execute(conn, query, params + seek_params + [page_size, offset])
+        )
+    if backward:
+        records.reverse()
+    if not records:
+        return dict(empty, total=total)
+    first, last = records[0], records[-1]
+    result = dict(
+        empty,
+        rows=records,
+        total=total,
+        next_cursor=encode_cursor(last["sort_key"], last["SeriesInstanceUID"]),
+        prev_cursor=encode_cursor(first["sort_key"], first["SeriesInstanceUID"]),
+    )
+    for record in records:
+        record.pop("sort_key", None)
+    return result
+
+
+def fetch_series_by_uid(series_uid: str) -> dict:
+    try:
+        with get_db_connection() as conn:
+            records = fetch_records(
+                execute(
+                    conn,
+                    f"SELECT {SERIES_COLUMNS} FROM {INDEX_TABLE} WHERE SeriesInstanceUID = ?",
+                    [series_uid],
+                )
+            )
+        return records[0] if records else {}
+    except Exception as e:
+        logging.exception(f"Error fetching IDC series {series_uid}: {e}")
+        return {}
+
+
+def fetch_series_by_uids(series_uids: list[str]) -> list[dict]:
+    """Index rows for many series at once, in no particular order."""
+    if not series_uids:
+        return []
+    try:
+        with get_db_connection() as conn:
+            return fetch_records(
+                execute(
+                    conn,
+                    f"""
+                    SELECT {SERIES_COLUMNS} FROM {INDEX_TABLE}
+                    WHERE SeriesInstanceUID IN (SELECT unnest(?))
+                    """,
+                    [list(series_uids)],
+                )
+            )
+    except Exception as e:
+        logging.exception(f"Error fetching IDC series: {e}")
+        return []
+
+
+def fetch_series_uids(filters: SeriesFilter, limit: int) -> list[str] | None:
+    """UIDs of every series matching ``filters`` (up to ``limit``).
+
+    Returns None when the query fails, so callers can tell that apart from
+    a search with no matches.
+    """
+    try:
+        with get_db_connection() as conn:
+            where_clause, params = filters.where(_use_text_index(conn, filters))
+            rows = execute(
+                conn,
+                f"""
+                SELECT SeriesInstanceUID FROM {INDEX_TABLE}
+                WHERE {where_clause}
+                LIMIT ?
+                """,
+                params + [limit],
+            ).fetchall()
+        return [row[0] for row in rows]
+    except Exception as e:
+        logging.exception(f"Error fetching IDC series UIDs: {e}")
+        return None
+
+
+def fetch_series_totals(series_uids: list[str]) -> dict:
+    """Series count, image count and size (MB) of a set of series."""
+    totals = {"series": 0, "images": 0, "size_mb": 0.0}
+    if not series_uids:
+        return totals
+    try:
+        with get_db_connection() as conn:
+            row = execute(
+                conn,
+                f"""
+                SELECT
+                    count(*),
+                    coalesce(sum(instanceCount), 0),
+                    coalesce(sum(series_size_MB), 0)
+                FROM {INDEX_TABLE}
+                WHERE SeriesInstanceUID IN (SELECT unnest(?))
+                """,
+                [list(series_uids)],
+            ).fetchone()
+        totals.update(series=int(row[0]), images=int(row[1]), size_mb=float(row[2]))
+    except Exception as e:
+        logging.exception(f"Error totalling IDC series: {e}")
+    return totals
+
+
+async def fetch_collections_async(timeout: float = QUERY_TIMEOUT_S) -> list[dict]:
+    try:
+        return await _executor.run(fetch_collections, timeout=timeout)
+    except asyncio.TimeoutError:
+        return []
+
+
+async def fetch_modalities_async(
+    collection: str = "", timeout: float = QUERY_TIMEOUT_S
+) -> list[dict]:
+    try:
+        return await _executor.run(fetch_modalities, collection, timeout=timeout)
+    except asyncio.TimeoutError:
+        return []
+
+
+async def fetch_body_parts_async(
+    collection: str = "", timeout: float = QUERY_TIMEOUT_S
+) -> list[dict]:
+    try:
+        return await _executor.run(fetch_body_parts, collection, timeout=timeout)
+    except asyncio.TimeoutError:
+        return []
+
+
+async def fetch_facet_counts_async(
+    filters: SeriesFilter = SeriesFilter(), timeout: float = QUERY_TIMEOUT_S
+) -> dict[str, list[dict]]:
+    try:
+        return await _executor.run(fetch_facet_counts, filters, timeout=timeout)
+    except asyncio.TimeoutError:
+        return {}
+
+
+async def fetch_series_async(
+    filters: SeriesFilter = SeriesFilter(),
+    limit: int = 1000,
+    timeout: float = QUERY_TIMEOUT_S,
+) -> list[dict]:
+    try:
+        return await _executor.run(fetch_series, filters, limit, timeout=timeout)
+    except asyncio.TimeoutError:
+        return []
+
+
+async def fetch_series_by_uid_async(
+    series_uid: str, timeout: float = QUERY_TIMEOUT_S
+) -> dict:
+    try:
+        return await _executor.run(fetch_series_by_uid, series_uid, timeout=timeout)
+    except asyncio.TimeoutError:
+        return {}
+
+
+async def fetch_series_by_uids_async(
+    series_uids: list[str], timeout: float = QUERY_TIMEOUT_S
+) -> list[dict]:
+    try:
+        return await _executor.run(fetch_series_by_uids, series_uids, timeout=timeout)
+    except asyncio.TimeoutError:
+        return []
+
+
+async def fetch_series_uids_async(
+    filters: SeriesFilter, limit: int, timeout: float = QUERY_TIMEOUT_S
+) -> list[str] | None:
+    try:
+        return await _executor.run(fetch_series_uids, filters, limit, timeout=timeout)
+    except asyncio.TimeoutError:
+        return None
+
+
+async def fetch_series_totals_async(
+    series_uids: list[str], timeout: float = QUERY_TIMEOUT_S
+) -> dict:
+    try:
+        return await _executor.run(fetch_series_totals, series_uids, timeout=timeout)
+    except asyncio.TimeoutError:
+        return {"series": 0, "images": 0, "size_mb": 0.0}
+
+
+async def search_series_async(
+    timeout: float = QUERY_TIMEOUT_S, query_key: str = "", **kwargs
+) -> dict:
+    """Run :func:`search_series` on the query pool, interrupting it on timeout."""
+    query_key = query_key or f"async-search:{uuid.uuid4()}"
+    try:
+        return await _executor.run(
+            search_series,
+            query_key=query_key,
+            timeout=timeout,
+            on_timeout=lambda: cancel_query(query_key),
+            **kwargs,
+        )
+    except asyncio.TimeoutError:
+        return dict(_EMPTY_PAGE, timed_out=True)
@@ -0,0 +1,188 @@
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from dicom_data_explorer.services.idc_index_db import CACHE_DIR
+from dicom_data_explorer.services.s3_downloader import is_complete
+
+CATALOG_PATH = CACHE_DIR / "local_catalog.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    series_uid TEXT PRIMARY KEY,
+    collection TEXT NOT NULL DEFAULT '',
+    instance_count INTEGER NOT NULL DEFAULT 0,
+    total_bytes INTEGER NOT NULL DEFAULT 0,
+    downloaded_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS instances (
+    series_uid TEXT NOT NULL REFERENCES series (series_uid) ON DELETE CASCADE,
+    key TEXT NOT NULL,
+    url TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL DEFAULT 0,
+    checksum TEXT NOT NULL DEFAULT '',
+    downloaded_at TEXT NOT NULL,
+    PRIMARY KEY (series_uid, key)
+);
+"""
+
+
+def _now() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+class LocalCatalog:
+    """SQLite catalog of series and instances that are fully downloaded.
+
+    The download engine records a series once all of its objects are on
+    disk; later requests for it are planned from here without touching S3.
+    ``checksum`` holds the S3 ETag when the manifest had one.
+    """
+
+    def __init__(self, path: Path = CATALOG_PATH):
+        self.path = path
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute("PRAGMA foreign_keys = ON")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def record_series(self, item: dict, objects: list[dict]) -> None:
+        """Replace the catalog entry of a completed series."""
+        series_uid = item.get("SeriesInstanceUID", "")
+        now = _now()
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM series WHERE series_uid = ?", [series_uid])
+                conn.execute(
+                    """
+                    INSERT INTO series
+                        (series_uid, collection, instance_count, total_bytes,
+                         downloaded_at)
+                    VALUES (?, ?, ?, ?, ?)
+                    """,
+                    [
+                        series_uid,
+                        item.get("Collection", "") or "",
+                        len(objects),
+                        sum(obj["size"] for obj in objects),
+                        now,
+                    ],
+                )
+                conn.executemany(
+                    """
+                    INSERT OR REPLACE INTO instances
+                        (series_uid, key, url, path, size, checksum, downloaded_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    [
+                        (
+                            series_uid,
+                            obj["key"],
+                            obj["url"],
+                            obj["dest_path"],
+                            obj["size"],
+                            obj.get("etag", "") or "",
+                            now,
+                        )
+                        for obj in objects
+                    ],
+                )
+
+    def forget(self, series_uid: str) -> None:
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM series WHERE series_uid = ?", [series_uid])
+
+    def local_series(self, series_uids: list[str]) -> set[str]:
+        """Which of ``series_uids`` are catalogued as downloaded (no disk access)."""
+        if not series_uids:
+            return set()
+        with self._lock:
+            rows = self._connection().execute(
+                """
+                SELECT series_uid FROM series
+                WHERE series_uid IN (SELECT value FROM json_each(?))
+                """,
+                [json.dumps(series_uids)],
+            ).fetchall()
+        return {row["series_uid"] for row in rows}
+
+    def local_objects(self, series_uid: str) -> list[dict] | None:
+        """Object tasks for a catalogued series whose files are all still on disk.
+
+        Returns None (and drops the entry) when the series is unknown or any
+        of its files went missing, so it is planned again from its manifest.
+        """
+        with self._lock:
+            rows = self._connection().execute(
+                """
+                SELECT key, url, path, size, checksum FROM instances
+                WHERE series_uid = ?
+                ORDER BY key
+                """,
+                [series_uid],
+            ).fetchall()
+        if not rows:
+            return None
+        if not all(is_complete(Path(row["path"]), row["size"]) for row in rows):
+            logging.info("Local copy of series %s is incomplete", series_uid)
+            self.forget(series_uid)
+            return None
+        return [
+            {
+                "key": row["key"],
+                "url": row["url"],
+                "dest_path": row["path"],
+                "size": row["size"],
+                "etag": row["checksum"],
+                "state": "done",
+            }
+            for row in rows
+        ]
+
+    def stats(self) -> dict:
+        with self._lock:
+            row = self._connection().execute(
+                """
+                SELECT
+                    count(*) AS series,
+                    coalesce(sum(instance_count), 0) AS instances,
+                    coalesce(sum(total_bytes), 0) AS bytes
+                FROM series
+                """
+            ).fetchone()
+        return dict(row)
+
+
+_catalog: LocalCatalog | None = None
+_catalog_lock = threading.Lock()
+
+
+def get_local_catalog() -> LocalCatalog:
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = LocalCatalog()
+        return _catalog
@@ -0,0 +1,97 @@
+import asyncio
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueryExecutor:
+    """Bounded thread pool that runs blocking DuckDB calls for async callers.
+
+    Keeping queries off the default executor stops a burst of slow searches
+    from starving unrelated ``asyncio.to_thread`` work, and the counters show
+    how deep the queue gets under load.
+    """
+
+    def __init__(self, max_workers: int, name: str = "idc-query"):
+        self.max_workers = max_workers
+        self.name = name
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._stats = {
+            "submitted": 0,
+            "queued": 0,
+            "running": 0,
+            "completed": 0,
+            "failed": 0,
+            "timeouts": 0,
+            "max_queue_depth": 0,
+        }
+
+    def start(self) -> None:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix=self.name
+                )
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _track(self, fn, *args, **kwargs):
+        with self._lock:
+            self._stats["queued"] -= 1
+            self._stats["running"] += 1
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            with self._lock:
+                self._stats["failed"] += 1
+            raise
+        finally:
+            with self._lock:
+                self._stats["running"] -= 1
+        with self._lock:
+            self._stats["completed"] += 1
+        return result
+
+    async def run(
+        self, fn, *args, timeout: float | None = None, on_timeout=None, **kwargs
+    ):
+        """Run ``fn`` on the pool; ``on_timeout`` fires if it is abandoned mid-run."""
+        if self._executor is None:
+            self.start()
+        with self._lock:
+            self._stats["submitted"] += 1
+            self._stats["queued"] += 1
+            self._stats["max_queue_depth"] = max(
+                self._stats["max_queue_depth"], self._stats["queued"]
+            )
+        future = self._executor.submit(
+            functools.partial(self._track, fn, *args, **kwargs)
+        )
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.cancel():
+                # Never started, so _track will not settle the queue count.
+                with self._lock:
+                    self._stats["queued"] -= 1
+            elif on_timeout is not None:
+                on_timeout()
+            if isinstance(e, asyncio.TimeoutError):
+                with self._lock:
+                    self._stats["timeouts"] += 1
+                logging.warning(
+                    "%s call %s timed out after %ss", self.name, fn.__name__, timeout
+                )
+            raise
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["max_workers"] = self.max_workers
+        return stats
@@ -0,0 +1,102 @@
+import threading
+import time
+from collections import deque
+
+
+class TokenBucket:
+    """Thread-safe token bucket; :meth:`acquire` blocks until a token is free."""
+
+    def __init__(self, rate: float, burst: float | None = None):
+        self.rate = rate
+        self.burst = burst or rate
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self) -> float:
+        """Take one token and return the seconds spent waiting for it."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def drain(self, seconds: float = 1.0) -> None:
+        """Push the bucket into debt so callers back off for ``seconds``."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, 0) - seconds * self.rate
+
+
+class CircuitBreaker:
+    """Opens when the recent failure rate spikes, then lets a probe through.
+
+    Outcomes of the last ``window`` calls are kept; once at least
+    ``min_calls`` are recorded and the failure share reaches ``threshold``
+    the breaker opens for ``cooldown_s``. After the cooldown one call is
+    allowed (half-open) and its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.5,
+        window: int = 50,
+        min_calls: int = 10,
+        cooldown_s: float = 30.0,
+    ):
+        self.threshold = threshold
+        self.min_calls = min_calls
+        self.cooldown_s = cooldown_s
+        self._outcomes: deque[bool] = deque(maxlen=window)
+        self._opened_at: float | None = None
+        self._probing = False
+        self._lock = threading.Lock()
+        self.trips = 0
+
+    def retry_after(self) -> float:
+        """Seconds until a call may proceed; 0 means go ahead."""
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            remaining = self._opened_at + self.cooldown_s - time.monotonic()
+            if remaining > 0:
+                return remaining
+            if self._probing:
+                return min(1.0, self.cooldown_s)
+            self._probing = True
+            return 0.0
+
+    def record(self, success: bool) -> None:
+        with self._lock:
+            if self._opened_at is not None and self._probing:
+                self._probing = False
+                if success:
+                    self._opened_at = None
+                    self._outcomes.clear()
+                else:
+                    self._opened_at = time.monotonic()
+                return
+            self._outcomes.append(success)
+            failures = self._outcomes.count(False)
+            if (
+                self._opened_at is None
+                and len(self._outcomes) >= self.min_calls
+                and failures / len(self._outcomes) >= self.threshold
+            ):
+                self._opened_at = time.monotonic()
+                self.trips += 1
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            return self._opened_at is not None
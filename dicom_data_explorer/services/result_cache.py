@@ -0,0 +1,142 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+
+class ResultCache:
+    """Byte-bounded LRU of JSON-serializable results with a TTL.
+
+    Entries evicted from memory are spilled to ``disk_dir`` when one is
+    given and read back on a later miss. Keys are hashed, so callers can use
+    any stable string.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        ttl_s: float,
+        disk_dir: Path | None = None,
+        max_disk_bytes: int = 0,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._entries: OrderedDict[str, tuple[float, int, str]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expired": 0,
+        }
+
+    @staticmethod
+    def _digest(key: str) -> str:
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    def get(self, key: str):
+        digest = self._digest(key)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                expires_at, size, payload = entry
+                if expires_at > now:
+                    self._entries.move_to_end(digest)
+                    self._stats["hits"] += 1
+                    return json.loads(payload)
+                del self._entries[digest]
+                self._bytes -= size
+                self._stats["expired"] += 1
+        payload = self._read_disk(digest, now)
+        with self._lock:
+            if payload is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["disk_hits"] += 1
+        self._store(digest, payload, now + self.ttl_s)
+        return json.loads(payload)
+
+    def put(self, key: str, value) -> None:
+        payload = json.dumps(value, separators=(",", ":"), default=str)
+        self._store(self._digest(key), payload, time.time() + self.ttl_s)
+
+    def _store(self, digest: str, payload: str, expires_at: float) -> None:
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+        spilled = []
+        with self._lock:
+            previous = self._entries.pop(digest, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[digest] = (expires_at, size, payload)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                old_digest, (old_expires, old_size, old_payload) = (
+                    self._entries.popitem(last=False)
+                )
+                self._bytes -= old_size
+                self._stats["evictions"] += 1
+                spilled.append((old_digest, old_expires, old_payload))
+        for old_digest, old_expires, old_payload in spilled:
+            self._write_disk(old_digest, old_expires, old_payload)
+
+    def _read_disk(self, digest: str, now: float) -> str | None:
+        if self.disk_dir is None:
+            return None
+        path = self.disk_dir / f"{digest}.json"
+        try:
+            expires_at, payload = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if expires_at <= now:
+            path.unlink(missing_ok=True)
+            return None
+        return payload
+
+    def _write_disk(self, digest: str, expires_at: float, payload: str) -> None:
+        if self.disk_dir is None or expires_at <= time.time():
+            return
+        try:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            path = self.disk_dir / f"{digest}.json"
+            path.write_text(json.dumps([expires_at, payload]), encoding="utf-8")
+            self._prune_disk()
+        except OSError as e:
+            logging.warning("Could not spill cached result to %s: %s", self.disk_dir, e)
+
+    def _prune_disk(self) -> None:
+        files = sorted(
+            (path.stat().st_mtime, path.stat().st_size, path)
+            for path in self.disk_dir.glob("*.json")
+        )
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.max_disk_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+        lookups = stats["hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (
+            round((stats["hits"] + stats["disk_hits"]) / lookups, 3) if lookups else 0.0
+        )
+        return stats
@@ -0,0 +1,412 @@
+import asyncio
+import contextlib
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from dicom_data_explorer.services.rate_limit import CircuitBreaker, TokenBucket
+
+DOWNLOAD_CONNECTIONS = int(os.getenv("IDC_DOWNLOAD_CONNECTIONS", "16"))
+DOWNLOAD_PER_SERIES = int(os.getenv("IDC_DOWNLOAD_PER_SERIES", "8"))
+DOWNLOAD_RETRIES = int(os.getenv("IDC_DOWNLOAD_RETRIES", "5"))
+# Requests per second allowed against one bucket (S3 sustains far more GETs
+# per prefix; this mostly smooths bursts after a SlowDown).
+BUCKET_RATE = float(os.getenv("IDC_DOWNLOAD_BUCKET_RATE", "200"))
+CIRCUIT_COOLDOWN_S = float(os.getenv("IDC_DOWNLOAD_CIRCUIT_COOLDOWN_S", "30"))
+CHUNK_SIZE = 1024 * 1024
+BACKOFF_BASE_S = 0.5
+BACKOFF_MAX_S = 30.0
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class IncompleteDownloadError(IOError):
+    """The transfer ended short of the expected size; safe to resume."""
+
+
+class ObjectChangedError(IOError):
+    """The remote object no longer matches the manifest."""
+
+
+class CircuitOpenError(IOError):
+    """Too many recent failures against a bucket; requests are paused."""
+
+
+TRANSIENT_ERRORS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+    IncompleteDownloadError,
+)
+
+
+class ThroughputMeter:
+    """Bytes per second over a sliding window, fed as chunks arrive."""
+
+    def __init__(self, window_s: float = 10.0):
+        self.window_s = window_s
+        self._samples: deque[tuple[float, int]] = deque()
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def _trim(self, now: float) -> None:
+        while self._samples and self._samples[0][0] < now - self.window_s:
+            self._total -= self._samples.popleft()[1]
+
+    def add(self, nbytes: int) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._samples.append((now, nbytes))
+            self._total += nbytes
+            self._trim(now)
+
+    def rate(self) -> float:
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            if not self._samples:
+                return 0.0
+            # Measure from the first sample once the window is not yet full,
+            # so a fresh transfer is not diluted by idle time before it.
+            span = min(self.window_s, max(now - self._samples[0][0], 1.0))
+            return self._total / span
+
+
+def part_path_for(dest_path: Path) -> Path:
+    return dest_path.with_name(f"{dest_path.name}.part")
+
+
+def is_complete(dest_path: Path, size: int = 0) -> bool:
+    """Whether ``dest_path`` holds a finished download of ``size`` bytes."""
+    try:
+        return dest_path.is_file() and (not size or dest_path.stat().st_size == size)
+    except OSError:
+        return False
+
+
+def _status(error: Exception) -> int:
+    response = getattr(error, "response", None)
+    return response.status_code if response is not None else 0
+
+
+def _is_slow_down(error: Exception) -> bool:
+    return _status(error) in {429, 503}
+
+
+def _is_server_error(error: Exception) -> bool:
+    """Failures that say something about the bucket's health, not one object."""
+    return _status(error) >= 500 or isinstance(
+        error, (requests.ConnectionError, requests.Timeout)
+    )
+
+
+class S3Downloader:
+    """Parallel object downloader over a pooled HTTP session.
+
+    ``max_connections`` bounds transfers across every caller (one worker
+    thread and one pooled keep-alive connection each); callers bound a single
+    series further with the semaphore from :meth:`series_limit`.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = DOWNLOAD_CONNECTIONS,
+        per_series: int = DOWNLOAD_PER_SERIES,
+        name: str = "s3-download",
+    ):
+        self.max_connections = max_connections
+        self.per_series = max(1, min(per_series, max_connections))
+        self.name = name
+        self._session: requests.Session | None = None
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._stats = {
+            "started": 0,
+            "active": 0,
+            "completed": 0,
+            "failed": 0,
+            "resumed": 0,
+            "retries": 0,
+            "throttled": 0,
+            "circuit_trips": 0,
+            "bytes": 0,
+        }
+        self._buckets: dict[str, tuple[TokenBucket, CircuitBreaker]] = {}
+        self._meter = ThroughputMeter()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                return
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.max_connections)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self._session = session
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_connections, thread_name_prefix=self.name
+            )
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+            session, self._session = self._session, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        if session is not None:
+            session.close()
+
+    @property
+    def session(self) -> requests.Session:
+        """The pooled session, shared with S3 listing requests."""
+        if self._session is None:
+            self.start()
+        return self._session
+
+    def series_limit(self) -> asyncio.Semaphore:
+        return asyncio.Semaphore(self.per_series)
+
+    def _bucket_guards(self, url: str) -> tuple[TokenBucket, CircuitBreaker]:
+        host = urlparse(url).netloc
+        with self._lock:
+            guards = self._buckets.get(host)
+            if guards is None:
+                guards = (
+                    TokenBucket(BUCKET_RATE),
+                    CircuitBreaker(cooldown_s=CIRCUIT_COOLDOWN_S),
+                )
+                self._buckets[host] = guards
+            return guards
+
+    def _fetch(
+        self,
+        url: str,
+        dest_path: Path,
+        size: int = 0,
+        etag: str = "",
+        on_chunk: Callable[[int], None] | None = None,
+    ) -> int:
+        with self._lock:
+            self._stats["started"] += 1
+            self._stats["active"] += 1
+        written = 0
+        try:
+            written = self._fetch_with_retries(url, dest_path, size, etag, on_chunk)
+        except Exception:
+            with self._lock:
+                self._stats["failed"] += 1
+            raise
+        finally:
+            with self._lock:
+                self._stats["active"] -= 1
+                self._stats["bytes"] += written
+        with self._lock:
+            self._stats["completed"] += 1
+        return written
+
+    def _fetch_with_retries(
+        self, url: str, dest_path: Path, size: int, etag: str, on_chunk
+    ) -> int:
+        """Retry transient failures with jittered exponential backoff.
+
+        Each attempt takes a token from the bucket's rate limiter and checks
+        its circuit breaker. A 503 SlowDown also drains the bucket so every
+        worker hitting that bucket slows down, not just the one that was told.
+        """
+        limiter, breaker = self._bucket_guards(url)
+        attempt = 0
+        circuit_wait = 0.0
+        while True:
+            wait = breaker.retry_after()
+            if wait:
+                # Waiting out an open circuit is not an attempt, but an object
+                # gives up once it has waited through a couple of cooldowns.
+                circuit_wait += wait
+                if circuit_wait > 2 * CIRCUIT_COOLDOWN_S:
+                    raise CircuitOpenError(f"Circuit open for {url}")
+                time.sleep(wait)
+                continue
+            limiter.acquire()
+            try:
+                return self._fetch_attempt(
+                    url, dest_path, size, etag, on_chunk, breaker
+                )
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if _is_slow_down(e):
+                    limiter.drain(delay or BACKOFF_BASE_S)
+                    with self._lock:
+                        self._stats["throttled"] += 1
+                if delay is None or attempt >= DOWNLOAD_RETRIES:
+                    raise
+                with self._lock:
+                    self._stats["retries"] += 1
+                logging.info(
+                    "Retrying %s in %.1fs (attempt %d): %s", url, delay, attempt + 1, e
+                )
+            time.sleep(delay)
+            attempt += 1
+
+    def _fetch_attempt(
+        self,
+        url: str,
+        dest_path: Path,
+        size: int,
+        etag: str,
+        on_chunk,
+        breaker: CircuitBreaker,
+    ) -> int:
+        try:
+            written = self._fetch_part(url, dest_path, size, etag, on_chunk)
+        except Exception as e:
+            self._record_failure(breaker, url, e)
+            raise
+        breaker.record(True)
+        return written
+
+    def _record_failure(self, breaker: CircuitBreaker, url: str, error: Exception):
+        # Only server-side and transport errors say the bucket is unhealthy.
+        was_open = breaker.is_open
+        breaker.record(not _is_server_error(error))
+        if breaker.is_open and not was_open:
+            with self._lock:
+                self._stats["circuit_trips"] += 1
+            logging.warning("Download circuit opened for %s after: %s", url, error)
+
+    @staticmethod
+    def _retry_delay(error: Exception, attempt: int) -> float | None:
+        """Backoff before the next attempt, or None if ``error`` is permanent."""
+        if isinstance(error, requests.HTTPError):
+            response = error.response
+            status = response.status_code if response is not None else 0
+            if status not in RETRYABLE_STATUS:
+                return None
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                return min(float(retry_after), BACKOFF_MAX_S)
+        elif isinstance(error, ObjectChangedError):
+            return None
+        elif not isinstance(error, TRANSIENT_ERRORS):
+            return None
+        # Full jitter keeps parallel workers from retrying in lockstep.
+        return random.uniform(0, min(BACKOFF_MAX_S, BACKOFF_BASE_S * 2**attempt))
+
+    def _fetch_part(
+        self, url: str, dest_path: Path, size: int, etag: str, on_chunk
+    ) -> int:
+        """Stream into ``<dest>.part``, resuming from its current length."""
+        dest_path.parent.mkdir(parents=True, exist_ok=True)
+        part_path = part_path_for(dest_path)
+        offset = part_path.stat().st_size if part_path.exists() else 0
+        if size and offset > size:
+            part_path.unlink()
+            offset = 0
+        written = 0
+        if not size or offset < size:
+            headers = {}
+            if offset:
+                headers["Range"] = f"bytes={offset}-"
+                if etag:
+                    # Only resume if the object is unchanged; otherwise S3
+                    # answers 200 with the full body.
+                    headers["If-Range"] = f'"{etag}"'
+            with self._session.get(
+                url, stream=True, timeout=(10, 120), headers=headers
+            ) as response:
+                if response.status_code == 416 and offset:
+                    # The part already holds the whole object.
+                    response.close()
+                else:
+                    response.raise_for_status()
+                    if offset and response.status_code != 206:
+                        offset = 0
+                    elif offset:
+                        with self._lock:
+                            self._stats["resumed"] += 1
+                    remote_etag = response.headers.get("ETag", "").strip('"')
+                    if etag and remote_etag and remote_etag != etag:
+                        part_path.unlink(missing_ok=True)
+                        raise ObjectChangedError(
+                            f"ETag mismatch for {url}: {remote_etag} != {etag}"
+                        )
+                    with open(part_path, "ab" if offset else "wb") as handle:
+                        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                            if chunk:
+                                handle.write(chunk)
+                                written += len(chunk)
+                                self._meter.add(len(chunk))
+                                if on_chunk is not None:
+                                    on_chunk(len(chunk))
+        actual = part_path.stat().st_size
+        if size and actual != size:
+            if actual > size:
+                part_path.unlink()
+            raise IncompleteDownloadError(
+                f"Size mismatch for {url}: expected {size}, got {actual}"
+            )
+        os.replace(part_path, dest_path)
+        return written
+
+    async def download(
+        self,
+        url: str,
+        dest_path: Path,
+        limit: asyncio.Semaphore | None = None,
+        size: int = 0,
+        etag: str = "",
+        on_chunk: Callable[[int], None] | None = None,
+    ) -> int:
+        """Download ``url`` to ``dest_path`` and return the bytes transferred.
+
+        ``size`` and ``etag`` come from the manifest; when given, a partial
+        file is only resumed while the object is unchanged, and the result
+        must match ``size`` before it is moved into place. ``on_chunk`` is
+        called from the worker thread with the length of every chunk received.
+        """
+        if self._executor is None:
+            self.start()
+        async with limit or contextlib.nullcontext():
+            return await asyncio.wrap_future(
+                self._executor.submit(
+                    self._fetch, url, dest_path, size, etag, on_chunk
+                )
+            )
+
+    def throughput(self) -> float:
+        """Current transfer rate in bytes per second across all downloads."""
+        return self._meter.rate()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["max_connections"] = self.max_connections
+        stats["per_series"] = self.per_series
+        return stats
+
+
+_downloader: S3Downloader | None = None
+_downloader_lock = threading.Lock()
+
+
+def get_downloader() -> S3Downloader:
+    """Return the process-wide downloader so all sessions share one pool."""
+    global _downloader
+    with _downloader_lock:
+        if _downloader is None:
+            _downloader = S3Downloader()
+            _downloader.start()
+            logging.info(
+                "Started S3 downloader (%d connections, %d per series)",
+                _downloader.max_connections,
+                _downloader.per_series,
+            )
+        return _downloader
@@ -1,100 +1,98 @@
 import reflex as rx
-from datetime import datetime
 import asyncio
 import logging
 import os
-from pathlib import Path
-import xml.etree.ElementTree as ET
-from urllib.parse import urlparse
-
-import requests
-
-
-DOWNLOAD_ROOT = Path(os.getenv("PUBLIC_DICOM_DIR", "/Users/Shared/DICOM"))
-
-
-def _sanitize_segment(value: str) -> str:
-    if not value:
-        return "unknown"
-    safe = str(value).strip().replace("/", "_").replace("\\", "_")
-    return safe or "unknown"
-
-
-def _ensure_dir(path: Path) -> None:
-    path.mkdir(parents=True, exist_ok=True)
-
-
-def _download_stream(url: str, dest_path: Path) -> None:
-    dest_path.parent.mkdir(parents=True, exist_ok=True)
-    with requests.get(url, stream=True, timeout=(10, 120)) as response:
-        response.raise_for_status()
-        with open(dest_path, "wb") as handle:
-            for chunk in response.iter_content(chunk_size=1024 * 1024):
-                if chunk:
-                    handle.write(chunk)
-
-
-def _normalize_s3_prefix(prefix: str) -> str:
-    cleaned = prefix.replace("*", "")
-    return cleaned
-
-
-def _parse_s3_url(series_aws_url: str) -> tuple[str, str]:
-    if not series_aws_url:
-        raise ValueError("Missing series_aws_url for IDC download")
-    parsed = urlparse(series_aws_url)
-    if parsed.scheme == "s3":
-        bucket = parsed.netloc
-        prefix = _normalize_s3_prefix(parsed.path.lstrip("/"))
-        return bucket, prefix
-    if parsed.scheme in {"http", "https"}:
-        host = parsed.netloc
-        if host.endswith(".s3.amazonaws.com"):
-            bucket = host.split(".s3.amazonaws.com")[0]
-            prefix = _normalize_s3_prefix(parsed.path.lstrip("/"))
-            return bucket, prefix
-        if host == "s3.amazonaws.com":
-            path_parts = parsed.path.lstrip("/").split("/", 1)
-            bucket = path_parts[0]
-            prefix = _normalize_s3_prefix(path_parts[1] if len(path_parts) > 1 else "")
-            return bucket, prefix
-    raise ValueError(f"Unsupported series_aws_url format: {series_aws_url}")
-
-
-def _list_s3_objects(bucket: str, prefix: str) -> list[str]:
-    keys: list[str] = []
-    continuation: str | None = None
-    while True:
-        params = {"list-type": "2", "prefix": prefix}
-        if continuation:
-            params["continuation-token"] = continuation
-        response = requests.get(
-            f"https://{bucket}.s3.amazonaws.com",
-            params=params,
-            timeout=(10, 120),
+import uuid
+
+from dicom_data_explorer.services.cart_store import get_cart_store
+from dicom_data_explorer.services.download_engine import (
+    get_download_engine,
+    get_download_queue,
+)
+from dicom_data_explorer.services.idc_service import (
+    fetch_series_by_uids_async,
+    fetch_series_totals_async,
+)
+
+# Upper bound on progress deltas pushed to each browser per second.
+PROGRESS_UPDATES_PER_S = float(os.getenv("IDC_PROGRESS_UPDATES_PER_S", "2"))
+MB = 1024 * 1024
+# Cart rows shown on the downloads page; the cart itself can be far larger.
+CART_PREVIEW_LIMIT = 100
+# Client tokens of the tabs with a running ``watch_downloads``. Kept out of
+# the state, which is persisted, so a hard restart cannot leave a stale flag.
+_watchers: set[str] = set()
+
+
+def _read_progress(owner: str) -> dict:
+    """``owner``'s queue totals and per-series rows, topped up with in-flight bytes."""
+    queue = get_download_queue()
+    progress = queue.progress(owner=owner)
+    live = {
+        series_task_id: entry
+        for series_task_id, entry in get_download_engine().live_progress().items()
+        if series_task_id in progress["downloading_ids"]
+    }
+    progress["throughput"] = sum(entry["throughput"] for entry in live.values())
+    progress["downloaded_bytes"] += sum(
+        entry["partial_bytes"] for entry in live.values()
+    )
+    series = []
+    for row in queue.series_progress(owner):
+        entry = live.get(row["id"], {"partial_bytes": 0, "throughput": 0.0})
+        done_bytes = row["done_bytes"] + entry["partial_bytes"]
+        planned = max(row["planned_bytes"], done_bytes)
+        series.append(
+            {
+                "series_uid": row["series_uid"],
+                "collection": row["collection"] or "",
+                "status": row["state"],
+                "files": f"{row['done_files']} / {row['total_files']}",
+                "done_mb": round(done_bytes / MB, 1),
+                "planned_mb": round(planned / MB, 1),
+                "percent": int(done_bytes * 100 / planned) if planned else 0,
+                "throughput_mb_s": round(entry["throughput"] / MB, 2),
+            }
         )
-        response.raise_for_status()
-        root = ET.fromstring(response.text)
-        for key_node in root.findall(".//{*}Contents/{*}Key"):
-            if key_node.text:
-                keys.append(key_node.text)
-        token_node = root.find(".//{*}NextContinuationToken")
-        if token_node is None or not token_node.text:
-            break
-        continuation = token_node.text
-    return keys
-
-
-def _get_idc_keys(series_aws_url: str) -> tuple[str, str, list[str]]:
-    bucket, prefix = _parse_s3_url(series_aws_url)
-    keys = [key for key in _list_s3_objects(bucket, prefix) if not key.endswith("/")]
-    if not keys:
-        raise ValueError(f"No objects found for IDC series at {series_aws_url}")
-    return bucket, prefix, keys
+    progress["series"] = series
+    return progress
+
+
+def _progress_snapshot(progress: dict) -> tuple:
+    return (
+        progress["active"],
+        progress["planning_series"],
+        progress["downloaded_files"],
+        progress["total_files"],
+        progress["current_series_uid"],
+        round(progress["downloaded_bytes"] / MB, 1),
+        round(progress["throughput"] / MB, 1),
+        tuple((row["status"], row["done_mb"]) for row in progress["series"]),
+    )
+
+
+def _cart_row(series_uid: str) -> dict:
+    """Placeholder for a cart entry that is not in the IDC index."""
+    return {
+        "SeriesInstanceUID": series_uid,
+        "Collection": series_uid,
+        "Modality": "",
+        "BodyPartExamined": "",
+        "ImageCount": 0,
+    }
 
 
 class DownloadState(rx.State):
+    # Carts and download jobs belong to this id, which the browser keeps in
+    # localStorage: unlike the session token it survives closing the tab
+    # and is shared by every tab.
+    owner_id: str = rx.LocalStorage("", name="dicom_explorer_owner", sync=True)
+    # The cart lives in the server-side cart store; only its newest rows and
+    # totals are kept here.
     cart_items: list[dict] = []
+    cart_count: int = 0
+    cart_images: int = 0
+    total_size_mb: float = 0.0
     download_history: list[dict] = []
     is_downloading: bool = False
     download_progress: int = 0
@@ -102,131 +100,240 @@ class DownloadState(rx.State):
     downloaded_files: int = 0
     current_series_uid: str = ""
     progress_message: str = ""
+    transferred_mb: float = 0.0
+    planned_mb: float = 0.0
+    throughput_mb_s: float = 0.0
+    eta_seconds: int = -1
+    series_progress: list[dict] = []
 
     @rx.var
-    def cart_count(self) -> int:
-        return len(self.cart_items)
+    def eta_label(self) -> str:
+        if self.eta_seconds < 0:
+            return "--:--"
+        minutes, seconds = divmod(self.eta_seconds, 60)
+        hours, minutes = divmod(minutes, 60)
+        if hours:
+            return f"{hours}:{minutes:02d}:{seconds:02d}"
+        return f"{minutes}:{seconds:02d}"
 
-    @rx.var
-    def total_size_mb(self) -> float:
-        total = 0.0
-        for item in self.cart_items:
-            size = item.get("series_size_MB")
-            if size:
-                try:
-                    total += float(size)
-                except (ValueError, TypeError) as e:
-                    logging.exception(f"Error calculating size for item: {e}")
-        return round(total, 2)
+    def _cart_owner(self) -> str:
+        if not self.owner_id:
+            self.owner_id = uuid.uuid4().hex
+        return self.owner_id
 
-    @rx.event
-    def add_to_cart(self, series: dict, source: str):
-        for item in self.cart_items:
-            if item["SeriesInstanceUID"] == series["SeriesInstanceUID"]:
-                return
-        item = series.copy()
-        item["source"] = source
-        item["added_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.cart_items.append(item)
+    async def _refresh_cart(self):
+        """Recompute cart totals from the index and reload the preview rows."""
+        try:
+            series_uids = await asyncio.to_thread(
+                get_cart_store().series_uids, self._cart_owner()
+            )
+        except Exception as e:
+            logging.exception(f"Error reading cart: {e}")
+            return
+        totals = await fetch_series_totals_async(series_uids)
+        self.cart_count = len(series_uids)
+        self.cart_images = totals["images"]
+        self.total_size_mb = round(totals["size_mb"], 2)
+        await self._load_cart_items()
 
-    @rx.event
-    def remove_from_cart(self, series_uid: str):
+    async def _change_cart_totals(self, series_uids: list[str], sign: int = 1):
+        """Add (or with ``sign=-1`` subtract) just these series to the totals."""
+        if series_uids:
+            totals = await fetch_series_totals_async(series_uids)
+            self._add_cart_totals(len(series_uids), totals, sign)
+
+    def _add_cart_totals(self, count: int, totals: dict, sign: int = 1):
+        self.cart_count = max(self.cart_count + sign * count, 0)
+        self.cart_images = max(self.cart_images + sign * totals["images"], 0)
+        self.total_size_mb = max(
+            round(self.total_size_mb + sign * totals["size_mb"], 2), 0.0
+        )
+
+    def _reset_cart(self):
+        self.cart_items = []
+        self.cart_count = 0
+        self.cart_images = 0
+        self.total_size_mb = 0.0
+
+    async def _load_cart_items(self):
+        """Reload the newest cart rows shown on the downloads page."""
+        try:
+            entries = await asyncio.to_thread(
+                get_cart_store().page, self._cart_owner(), CART_PREVIEW_LIMIT
+            )
+        except Exception as e:
+            logging.exception(f"Error reading cart: {e}")
+            return
+        rows = {
+            row["SeriesInstanceUID"]: row
+            for row in await fetch_series_by_uids_async(
+                [entry["series_uid"] for entry in entries]
+            )
+        }
         self.cart_items = [
-            item for item in self.cart_items if item["SeriesInstanceUID"] != series_uid
+            rows.get(entry["series_uid"], _cart_row(entry["series_uid"]))
+            | {"source": entry["source"], "added_at": entry["added_at"]}
+            for entry in entries
         ]
 
     @rx.event
-    def clear_cart(self):
-        self.cart_items = []
+    async def refresh_cart(self):
+        await self._refresh_cart()
+
+    @rx.event
+    async def load_cart_items(self):
+        await self._load_cart_items()
+
+    @rx.event
+    async def add_to_cart(self, series: dict, source: str):
+        try:
+            added = await asyncio.to_thread(
+                get_cart_store().add,
+                self._cart_owner(),
+                [series["SeriesInstanceUID"]],
+                source,
+            )
+        except Exception as e:
+            logging.exception(f"Error adding to cart: {e}")
+            return
+        if added:
+            await self._change_cart_totals(added)
+            await self._load_cart_items()
+
+    @rx.event
+    async def remove_from_cart(self, series_uid: str):
+        try:
+            removed = await asyncio.to_thread(
+                get_cart_store().remove, self._cart_owner(), series_uid
+            )
+        except Exception as e:
+            logging.exception(f"Error removing from cart: {e}")
+            return
+        if removed:
+            await self._change_cart_totals([series_uid], -1)
+            await self._load_cart_items()
+
+    @rx.event
+    async def clear_cart(self):
+        await asyncio.to_thread(get_cart_store().clear, self._cart_owner())
+        self._reset_cart()
 
     @rx.event
     async def start_download(self):
-        """Download selected series and store DICOM files locally."""
-        if not self.cart_items:
+        """Queue the cart for download by the background worker.
+
+        The job is persisted, so it keeps running (and resumes after a
+        server restart) whether or not this page stays open.
+        """
+        store = get_cart_store()
+        owner = self._cart_owner()
+        try:
+            series_uids = await asyncio.to_thread(store.series_uids, owner, "IDC")
+        except Exception as e:
+            logging.exception(f"Error reading cart: {e}")
+            return
+        if len(series_uids) < self.cart_count:
+            logging.warning("Only IDC series in the cart can be downloaded")
+        rows = {
+            row["SeriesInstanceUID"]: row
+            for row in await fetch_series_by_uids_async(series_uids)
+        }
+        items = [rows[uid] | {"source": "IDC"} for uid in series_uids if uid in rows]
+        if len(items) < len(series_uids):
+            logging.warning(
+                "%d cart series are not in the IDC index",
+                len(series_uids) - len(items),
+            )
+        if not items:
             return
+        try:
+            await asyncio.to_thread(
+                get_download_queue().enqueue, items, owner
+            )
+        except Exception as e:
+            logging.exception(f"Error queueing download: {e}")
+            return
+        get_download_engine().notify()
+        await asyncio.to_thread(store.clear, owner)
+        self._reset_cart()
         self.is_downloading = True
-        self.download_progress = 0
-        self.total_files = 0
-        self.downloaded_files = 0
-        self.current_series_uid = ""
-        self.progress_message = "Preparing download..."
-        idc_plan: dict[str, dict] = {}
-        yield
-        for item in self.cart_items:
-            source = item.get("source", "").upper()
-            if source == "IDC":
-                series_aws_url = item.get("series_aws_url", "")
+        self.progress_message = "Queued..."
+        return DownloadState.watch_downloads
+
+    @rx.event
+    async def load_downloads(self):
+        await self._refresh_cart()
+        return DownloadState.watch_downloads
+
+    @rx.event(background=True)
+    async def watch_downloads(self):
+        """Mirror this browser's queue progress into the page until its jobs finish."""
+        async with self:
+            token = self.router.session.client_token
+            if token in _watchers:
+                return
+            _watchers.add(token)
+            owner = self._cart_owner()
+        try:
+            queue = get_download_queue()
+            last_snapshot = None
+            history_version = None
+            history = None
+            while True:
                 try:
-                    bucket, prefix, keys = await asyncio.to_thread(
-                        _get_idc_keys, series_aws_url
-                    )
-                    idc_plan[item.get("SeriesInstanceUID", "")] = {
-                        "bucket": bucket,
-                        "prefix": prefix,
-                        "keys": keys,
-                    }
-                    self.total_files += len(keys)
+                    progress = await asyncio.to_thread(_read_progress, owner)
+                    history_key = (progress["active"], progress["finished_series"])
+                    if history_key != history_version:
+                        history_version = history_key
+                        history = await asyncio.to_thread(queue.history, owner)
                 except Exception as e:
-                    logging.exception("IDC listing failed for %s: %s", item, e)
-            else:
-                logging.warning("Unsupported source in cart: %s", source)
-            yield
-        if self.total_files == 0:
-            self.total_files = len(self.cart_items)
-        self.progress_message = "Downloading..."
-        yield
-        completed_items: list[dict] = []
-        for item in self.cart_items:
-            try:
-                source = item.get("source", "").upper()
-                self.current_series_uid = item.get("SeriesInstanceUID", "")
-                if source != "IDC":
-                    logging.warning("Skipping unsupported source: %s", source)
-                    yield
-                    continue
-                series_aws_url = item.get("series_aws_url", "")
-                collection = _sanitize_segment(item.get("Collection", ""))
-                series_dir = DOWNLOAD_ROOT / collection / _sanitize_segment(
-                    self.current_series_uid
-                )
-                plan = idc_plan.get(self.current_series_uid)
-                if not plan:
-                    bucket, prefix, keys = await asyncio.to_thread(
-                        _get_idc_keys, series_aws_url
-                    )
-                    plan = {"bucket": bucket, "prefix": prefix, "keys": keys}
-                prefix_path = Path(plan["prefix"])
-                _ensure_dir(series_dir)
-                for key in plan["keys"]:
-                    key_path = Path(key)
-                    if plan["prefix"] and key.startswith(plan["prefix"]):
-                        rel_path = key_path.relative_to(prefix_path)
-                    else:
-                        rel_path = Path(key_path.name)
-                    dest_path = series_dir / rel_path
-                    if not dest_path.exists():
-                        url = f"https://{plan['bucket']}.s3.amazonaws.com/{key}"
-                        await asyncio.to_thread(_download_stream, url, dest_path)
-                    self.downloaded_files += 1
-                    if self.total_files > 0:
-                        self.download_progress = int(
-                            self.downloaded_files / self.total_files * 100
-                        )
-                    yield
-                history_item = item.copy()
-                history_item["downloaded_at"] = datetime.now().strftime(
-                    "%Y-%m-%d %H:%M:%S"
-                )
-                completed_items.append(history_item)
-            except Exception as e:
-                logging.exception("Download failed for %s: %s", item, e)
-            yield
-        for history_item in reversed(completed_items):
-            self.download_history.insert(0, history_item)
-        self.cart_items = []
-        self.is_downloading = False
-        self.download_progress = 0
-        self.total_files = 0
-        self.downloaded_files = 0
-        self.current_series_uid = ""
-        self.progress_message = ""
\ No newline at end of file
+                    logging.exception(f"Error reading download queue: {e}")
+                    break
+                snapshot = _progress_snapshot(progress)
+                # Only touch state when something visible changed, so an idle
+                # or stalled download does not keep pushing deltas.
+                if snapshot != last_snapshot or history is not None:
+                    async with self:
+                        self._apply_progress(progress)
+                        if history is not None:
+                            self.download_history = history
+                    last_snapshot = snapshot
+                    history = None
+                if not progress["active"]:
+                    break
+                await asyncio.sleep(1 / PROGRESS_UPDATES_PER_S)
+        finally:
+            _watchers.discard(token)
+
+    def _apply_progress(self, progress: dict):
+        self.is_downloading = progress["active"]
+        self.total_files = progress["total_files"]
+        self.downloaded_files = progress["downloaded_files"]
+        self.current_series_uid = progress["current_series_uid"]
+        self.series_progress = progress["series"]
+        if not progress["active"]:
+            self.download_progress = 0
+            self.progress_message = ""
+            self.transferred_mb = 0.0
+            self.planned_mb = 0.0
+            self.throughput_mb_s = 0.0
+            self.eta_seconds = -1
+            return
+        planned, downloaded = progress["planned_bytes"], progress["downloaded_bytes"]
+        remaining = max(planned - downloaded, 0)
+        self.download_progress = (
+            min(int(downloaded * 100 / planned), 100) if planned else 0
+        )
+        self.transferred_mb = round(downloaded / MB, 1)
+        self.planned_mb = round(planned / MB, 1)
+        self.throughput_mb_s = round(progress["throughput"] / MB, 2)
+        self.eta_seconds = (
+            int(remaining / progress["throughput"]) if progress["throughput"] else -1
+        )
+        if progress["planning_series"]:
+            self.progress_message = (
+                f"Planning {progress['planning_series']} of "
+                f"{progress['total_series']} series..."
+            )
+        else:
+            self.progress_message = "Downloading..."
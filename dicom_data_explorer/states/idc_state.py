@@ -1,17 +1,52 @@
+import asyncio
+import logging
+import os
+
 import reflex as rx
+from dicom_data_explorer.services.cart_store import get_cart_store
 from dicom_data_explorer.services.idc_service import (
-    fetch_collections,
-    fetch_modalities,
-    fetch_body_parts,
-    fetch_series,
+    cancel_query,
+    fetch_facet_counts_async,
+    fetch_series_by_uid_async,
+    fetch_series_uids_async,
+    search_series_async,
 )
+from dicom_data_explorer.services.idc_query import SeriesFilter
+from dicom_data_explorer.services.local_catalog import get_local_catalog
+from dicom_data_explorer.states.download_state import DownloadState
+
+SEARCH_DEBOUNCE_S = 0.3
+# Most series a single "add all" puts in the cart.
+BULK_ADD_LIMIT = int(os.getenv("IDC_BULK_ADD_LIMIT", "50000"))
+
+
+def _parse_int(value: str) -> int | None:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _mark_local(rows: list[dict]) -> list[dict]:
+    """Flag rows whose series is already downloaded (``is_local``)."""
+    try:
+        local = get_local_catalog().local_series(
+            [row["SeriesInstanceUID"] for row in rows]
+        )
+    except Exception as e:
+        logging.exception(f"Error reading local catalog: {e}")
+        local = set()
+    return [row | {"is_local": row["SeriesInstanceUID"] in local} for row in rows]
 
 
 class IDCState(rx.State):
     collections: list[dict] = []
-    modalities: list[str] = []
-    body_parts: list[str] = []
+    modalities: list[dict] = []
+    body_parts: list[dict] = []
     series_results: list[dict] = []
+    total_count: int = 0
+    next_cursor: str = ""
+    prev_cursor: str = ""
     selected_collection: str = ""
     selected_modality: str = ""
     selected_body_part: str = ""
@@ -21,102 +56,32 @@ class IDCState(rx.State):
     page: int = 1
     items_per_page: int = 10
     selected_series_uid: str = ""
+    selected_series_details: dict = {}
     sort_field: str = "SeriesDate"
     sort_direction: str = "desc"
     search_query: str = ""
     min_images: str = ""
     max_images: str = ""
+    is_adding_all: bool = False
+    bulk_add_message: str = ""
+    _search_generation: int = 0
 
     @rx.var
     def total_pages(self) -> int:
-        return (
-            len(self.filtered_results) + self.items_per_page - 1
-        ) // self.items_per_page
+        return (self.total_count + self.items_per_page - 1) // self.items_per_page
 
     @rx.var
     def current_page_results(self) -> list[dict]:
-        start = (self.page - 1) * self.items_per_page
-        end = start + self.items_per_page
-        return self.filtered_results[start:end]
-
-    @rx.var
-    def filtered_results(self) -> list[dict]:
-        results = self.series_results
-        query = self.search_query.strip().lower()
-        if query:
-            def matches(item: dict) -> bool:
-                haystack = " ".join(
-                    str(item.get(field, ""))
-                    for field in [
-                        "Collection",
-                        "SeriesDescription",
-                        "SeriesInstanceUID",
-                        "Modality",
-                        "BodyPartExamined",
-                    ]
-                ).lower()
-                return query in haystack
-
-            results = [item for item in results if matches(item)]
-
-        def parse_int(value: str) -> int | None:
-            try:
-                return int(value)
-            except (TypeError, ValueError):
-                return None
-
-        min_val = parse_int(self.min_images)
-        max_val = parse_int(self.max_images)
-        if min_val is not None:
-            results = [
-                item
-                for item in results
-                if int(item.get("ImageCount") or 0) >= min_val
-            ]
-        if max_val is not None:
-            results = [
-                item
-                for item in results
-                if int(item.get("ImageCount") or 0) <= max_val
-            ]
-
-        sort_key = self.sort_field
-        reverse = self.sort_direction == "desc"
-
-        def key_func(item: dict):
-            value = item.get(sort_key, "")
-            if sort_key == "ImageCount":
-                try:
-                    return int(value)
-                except (TypeError, ValueError):
-                    return 0
-            return value or ""
-
-        return sorted(results, key=key_func, reverse=reverse)
-
-    @rx.var
-    def selected_series_details(self) -> dict:
-        if not self.selected_series_uid:
-            return {}
-        for series in self.series_results:
-            if series.get("SeriesInstanceUID") == self.selected_series_uid:
-                return series
-        return {}
+        return self.series_results
 
-    @rx.event
-    def load_initial_data(self):
+    @rx.event(background=True)
+    async def load_initial_data(self):
         """Load collections on mount."""
-        self.is_loading = True
-        yield
-        cols = fetch_collections()
-        self.collections = cols
-        mods = fetch_modalities()
-        self.modalities = [m.get("Modality") for m in mods if m.get("Modality")]
-        parts = fetch_body_parts()
-        self.body_parts = [
-            b.get("BodyPartExamined") for b in parts if b.get("BodyPartExamined")
-        ]
-        self.is_loading = False
+        async with self:
+            self.is_loading = True
+        await self._refresh_facets()
+        async with self:
+            self.is_loading = False
 
     @rx.event
     def update_filters(self, key: str, value: str):
@@ -128,11 +93,119 @@ class IDCState(rx.State):
         elif key == "body_part":
             self.selected_body_part = value
         self.page = 1
+        return IDCState.refresh_facets
+
+    async def _refresh_facets(self):
+        async with self:
+            selection = self._series_filter().facet_selection()
+        facets = await fetch_facet_counts_async(selection)
+        async with self:
+            current = self._series_filter().facet_selection()
+            if not facets or current != selection:
+                return
+            self.collections = facets["collection"]
+            self.modalities = facets["modality"]
+            self.body_parts = facets["body_part"]
+
+    @rx.event(background=True)
+    async def refresh_facets(self):
+        await self._refresh_facets()
+
+    def _series_filter(self) -> SeriesFilter:
+        return SeriesFilter(
+            collection=self.selected_collection,
+            modality=self.selected_modality,
+            body_part=self.selected_body_part,
+            text=self.search_query,
+            min_images=_parse_int(self.min_images),
+            max_images=_parse_int(self.max_images),
+        )
+
+    def _search_kwargs(self) -> dict:
+        return {
+            "filters": self._series_filter(),
+            "sort_field": self.sort_field,
+            "sort_direction": self.sort_direction,
+            "page": self.page,
+            "page_size": self.items_per_page,
+        }
+
+    def _query_key(self) -> str:
+        return f"idc-search:{self.router.session.client_token}"
+
+    @rx.event(background=True)
+    async def run_search(self, debounce: float = 0.0, after: str = "", before: str = ""):
+        """Run the current search off the event queue, newest request wins."""
+        async with self:
+            if not self.search_performed:
+                return
+            self._search_generation += 1
+            generation = self._search_generation
+        if debounce:
+            await asyncio.sleep(debounce)
+        async with self:
+            if generation != self._search_generation:
+                return
+            kwargs = self._search_kwargs()
+            query_key = self._query_key()
+        result = await search_series_async(
+            after=after, before=before, query_key=query_key, **kwargs
+        )
+        rows = await asyncio.to_thread(_mark_local, result["rows"])
+        async with self:
+            if generation != self._search_generation or result["cancelled"]:
+                return
+            self.error_message = (
+                "The search took too long. Try narrowing the filters."
+                if result["timed_out"]
+                else ""
+            )
+            self.series_results = rows
+            self.bulk_add_message = ""
+            self.total_count = result["total"]
+            self.next_cursor = result["next_cursor"]
+            self.prev_cursor = result["prev_cursor"]
+            self.is_loading = False
+
+    @rx.event(background=True)
+    async def add_all_to_cart(self):
+        """Put every series matching the current search in the cart."""
+        async with self:
+            if self.is_adding_all:
+                return
+            self.is_adding_all = True
+            self.bulk_add_message = ""
+            self.error_message = ""
+            filters = self._series_filter()
+            owner = (await self.get_state(DownloadState))._cart_owner()
+        series_uids = await fetch_series_uids_async(filters, BULK_ADD_LIMIT)
+        added = None
+        if series_uids is not None:
+            try:
+                added = await asyncio.to_thread(
+                    get_cart_store().add, owner, series_uids, "IDC"
+                )
+            except Exception as e:
+                logging.exception(f"Error adding search results to cart: {e}")
+        async with self:
+            self.is_adding_all = False
+            if added is None:
+                self.error_message = (
+                    "Could not add the search results to the cart. "
+                    "Try again or narrow the filters."
+                )
+                return
+            self.bulk_add_message = f"Added {len(added)} series to the cart"
+            if len(series_uids) >= BULK_ADD_LIMIT:
+                self.bulk_add_message += f" (first {BULK_ADD_LIMIT} results)"
+        # Recount the whole cart: the badge must not drift from the store.
+        return DownloadState.refresh_cart
 
     @rx.event
     def update_search_query(self, value: str):
         self.search_query = value
         self.page = 1
+        return IDCState.run_search(SEARCH_DEBOUNCE_S)
 
     @rx.event
     def update_min_images(self, value: float):
@@ -141,6 +214,7 @@ class IDCState(rx.State):
         except (TypeError, ValueError):
             self.min_images = ""
         self.page = 1
+        return IDCState.run_search(SEARCH_DEBOUNCE_S)
 
     @rx.event
     def update_max_images(self, value: float):
@@ -149,16 +223,19 @@ class IDCState(rx.State):
         except (TypeError, ValueError):
             self.max_images = ""
         self.page = 1
+        return IDCState.run_search(SEARCH_DEBOUNCE_S)
 
     @rx.event
     def update_sort_field(self, value: str):
         self.sort_field = value
         self.page = 1
+        return IDCState.run_search
 
     @rx.event
     def update_sort_direction(self, value: str):
         self.sort_direction = value
         self.page = 1
+        return IDCState.run_search
 
     @rx.event
     def search_data(self):
@@ -166,19 +243,16 @@ class IDCState(rx.State):
         self.is_loading = True
         self.search_performed = True
         self.series_results = []
+        self.total_count = 0
         self.page = 1
         self.selected_series_uid = ""
-        yield
-        results = fetch_series(
-            collection=self.selected_collection,
-            modality=self.selected_modality,
-            body_part=self.selected_body_part,
-        )
-        self.series_results = results
-        self.is_loading = False
+        self.selected_series_details = {}
+        return IDCState.run_search
 
     @rx.event
     def clear_search(self):
+        self._search_generation += 1
+        cancel_query(self._query_key())
         self.selected_collection = ""
         self.selected_modality = ""
         self.selected_body_part = ""
@@ -188,16 +262,62 @@ class IDCState(rx.State):
         self.sort_field = "SeriesDate"
         self.sort_direction = "desc"
         self.series_results = []
+        self.total_count = 0
+        self.next_cursor = ""
+        self.prev_cursor = ""
         self.search_performed = False
+        self.is_loading = False
         self.page = 1
+        self.error_message = ""
+        return IDCState.refresh_facets
 
     @rx.event
     def set_page(self, page: int):
-        self.page = page
+        self.page = max(1, min(page, self.total_pages))
+        return IDCState.run_search
+
+    def _take_cursors(self) -> tuple[str, str]:
+        """Hand out the page's cursors once.
+
+        Until the neighbouring page has loaded, further clicks jump to
+        ``page`` without a cursor instead of reusing a stale one.
+        """
+        cursors = self.next_cursor, self.prev_cursor
+        self.next_cursor = ""
+        self.prev_cursor = ""
+        return cursors
+
+    @rx.event
+    def next_page(self):
+        if self.page >= self.total_pages:
+            return
+        self.page += 1
+        return IDCState.run_search(0.0, self._take_cursors()[0], "")
+
+    @rx.event
+    def prev_page(self):
+        if self.page <= 1:
+            return
+        self.page -= 1
+        return IDCState.run_search(0.0, "", self._take_cursors()[1])
 
     @rx.event
     def select_series(self, uid: str):
-        if self.selected_series_uid == uid:
+        if self.selected_series_uid == uid or not uid:
             self.selected_series_uid = ""
-        else:
-            self.selected_series_uid = uid
\ No newline at end of file
+            self.selected_series_details = {}
+            return
+        self.selected_series_uid = uid
+        for series in self.series_results:
+            if series.get("SeriesInstanceUID") == uid:
+                self.selected_series_details = series
+                return
+        self.selected_series_details = {}
+        return IDCState.load_series_details(uid)
+
+    @rx.event(background=True)
+    async def load_series_details(self, uid: str):
+        details = await fetch_series_by_uid_async(uid)
+        async with self:
+            if self.selected_series_uid == uid:
+                self.selected_series_details = details
\ No newline at end of file
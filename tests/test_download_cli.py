@@ -0,0 +1,28 @@
+import json
+
+import pytest
+
+from dicom_data_explorer.download_cli import read_manifest, search_filter
+from dicom_data_explorer.services.idc_query import SeriesFilter
+
+
+def test_saved_search_coerces_image_counts(tmp_path):
+    path = tmp_path / "search.json"
+    path.write_text(
+        json.dumps({"search": {"modality": "MR", "min_images": "100", "other": 1}})
+    )
+    assert read_manifest(path) == ([], SeriesFilter(modality="MR", min_images=100))
+
+
+@pytest.mark.parametrize(
+    "fields, error",
+    [
+        ({"min_images": "lots"}, ValueError),
+        ({"min_images": 1.5}, TypeError),
+        ({"max_images": True}, TypeError),
+        ({"modality": ["MR"]}, TypeError),
+    ],
+)
+def test_saved_search_rejects_bad_values(fields, error):
+    with pytest.raises(error):
+        search_filter(fields)
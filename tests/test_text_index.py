@@ -0,0 +1,82 @@
+import duckdb
+import pytest
+
+from dicom_data_explorer.services.idc_index_db import (
+    INDEX_TABLE,
+    SEARCH_TEXT_EXPR,
+    _build_text_index,
+)
+from dicom_data_explorer.services.idc_query import SeriesFilter
+
+SERIES = [
+    ("lidc_idri", "CT Chest", "1.3.6.1.4.1.14519.5.2.1.6279.1772016905.79483", "CT", "CHEST"),
+    ("lidc_idri", "AX T1 post", "1.3.6.1.4.1.14519.5.2.1.6279.1772016905.12345", "MR", "BRAIN"),
+    ("upenn_gbm", "t1\tbrain", "1.3.6.1.4.1.14519.5.2.1.99.1706308267.810798", "MR", "BRAIN"),
+    ("nlst", "1.5mm lung", "2.25.1234567890", "CT", None),
+    ("nlst", None, "2.25.9876543210", "SR", "LUNG"),
+]
+
+
+@pytest.fixture(scope="module")
+def conn():
+    conn = duckdb.connect()
+    conn.execute(
+        """
+        CREATE TABLE series (
+            collection_id TEXT,
+            SeriesDescription TEXT,
+            SeriesInstanceUID TEXT,
+            Modality TEXT,
+            BodyPartExamined TEXT
+        )
+        """
+    )
+    conn.executemany("INSERT INTO series VALUES (?, ?, ?, ?, ?)", SERIES)
+    conn.execute(
+        f"""
+        CREATE TABLE {INDEX_TABLE} AS
+        SELECT
+            *,
+            {SEARCH_TEXT_EXPR} AS search_text,
+            row_number() OVER (ORDER BY SeriesInstanceUID)::INTEGER AS row_id
+        FROM series
+        """
+    )
+    _build_text_index(conn)
+    yield conn
+    conn.close()
+
+
+def _matches(conn, filters: SeriesFilter, indexed: bool) -> list[tuple]:
+    query, params = filters.matches(indexed)
+    return sorted(
+        conn.execute(
+            f"SELECT SeriesInstanceUID, relevance FROM ({query})", params
+        ).fetchall()
+    )
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        # From the middle of a UID, so no prefix lookup could find it.
+        "1772016905.79483",
+        "6279.1772016905",
+        "brain",
+        "t1",
+        "lung 2.25",
+        "1.5",
+        "ct chest",
+        "idri",
+        "nosuchterm",
+    ],
+)
+def test_index_and_scan_agree(conn, text):
+    filters = SeriesFilter(text=text)
+    scanned = _matches(conn, filters, indexed=False)
+    assert _matches(conn, filters, indexed=True) == scanned
+    assert scanned or text == "nosuchterm"
+
+
+def test_uid_fragments_are_never_indexed():
+    assert SeriesFilter(text="1772016905.79483 brain").indexed_terms() == ["brain"]